@@ -1,22 +1,39 @@
 import streamlit as st
 import pandas as pd
-import calendar
 from datetime import datetime, date
-import base64
-import requests
 import os
 import glob
 
+import calendarios
+import credenciales
+import importar
+import persistencia
+from recursos import imagen, ANCHO_MOVIL
+from diagnostico import Diagnostico
+from turnos import registro, TURNOS_EDITABLES
+from vistas import (
+    cuadrante_general, html_cuadrante_usuario, html_calendario, tamano_html,
+    excel_a_html, hojas_excel, FILAS_VISTA_PREVIA
+)
+from datos import (
+    normalizar_nip, cuadrante_aplicado, aplicar_historial, precargar_meses,
+    indice_compañeros, es_festivo, PRECARGA_VALIDEZ_SEG
+)
+from resumen import resumen_anual, tabla_personal, resumen_guardado, ruta_resumen, meses_del_anio
+from exportar import exportar_bytes, meses_aplicados, nombre_fichero, MIME_XLSX
+
 # ==================================================
 # CONFIGURACIÓN GENERAL
 # ==================================================
 st.set_page_config(page_title="Cuadrante 2026", layout="wide")
 
 ADMIN_USER = "ADMIN"
-ADMIN_PASS = "PoliciaLocal2021!"
+ADMIN_PASS = st.secrets.get("ADMIN_PASS", "PoliciaLocal2021!")
 
 USERS_FILE = "usuarios.csv"
-HISTORIAL_FILE = "historial_cambios.csv"
+
+# Índice de credenciales (se recarga solo si cambia usuarios.csv)
+credenciales.indice.configurar(USERS_FILE, ADMIN_USER, ADMIN_PASS)
 CUADRANTES_DIR = "cuadrantes"
 
 ESCUDO_FILE = "Placa.png"
@@ -37,22 +54,24 @@ if "nip" not in st.session_state:
 if "is_admin" not in st.session_state:
     st.session_state.is_admin = False
 
+if "cambios_pendientes" not in st.session_state:
+    st.session_state.cambios_pendientes = []
+
 
 # ==================================================
 # GITHUB (PERSISTENCIA)
 # ==================================================
-GITHUB_USER = "samuelfdezp-rgb"
-GITHUB_REPO = "Cuadrante-2026"
-GITHUB_BRANCH = "main"
-
 GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
 
+# Segundos mínimos entre dos consultas del historial a GitHub (0 = siempre)
+HISTORIAL_REFRESCO_SEG = float(st.secrets.get("HISTORIAL_REFRESCO_SEG", 0))
+
+# Los cambios se suben a GitHub en segundo plano
+persistencia.escritura.iniciar(GITHUB_TOKEN)
+
 # ==================================================
 # FUNCIONES BASE
 # ==================================================
-def normalizar_nip(nip):
-    return str(nip).strip().zfill(6)
-
 def listar_cuadrantes():
     archivos = sorted(glob.glob(f"{CUADRANTES_DIR}/*.csv"))
     resultado = {}
@@ -68,181 +87,40 @@ def listar_cuadrantes():
 
     return resultado
 
-def cargar_cuadrantes():
-    archivos = glob.glob(f"{CUADRANTES_DIR}/*.csv")
-    if not archivos:
-        st.error("No hay cuadrantes disponibles")
-        st.stop()
-
-    dfs = []
-
-    for ruta in archivos:
-        df_tmp = pd.read_csv(
-            ruta,
-            parse_dates=["Fecha"]
-        )
-
-        df_tmp["nip"] = df_tmp["NIP"].apply(normalizar_nip)
-        df_tmp["fecha"] = df_tmp["Fecha"]
-        df_tmp["dia"] = df_tmp["fecha"].dt.day
-        df_tmp["mes"] = df_tmp["Mes"]
-        df_tmp["anio"] = df_tmp["Año"]
-
-        df_tmp = df_tmp.rename(columns={
-            "Nombre y Apellidos": "nombre",
-            "Categoría": "categoria",
-            "Turno": "turno"
-        })
-
-        dfs.append(df_tmp)
-
-    return pd.concat(dfs, ignore_index=True)
-
-def aplicar_historial(df, df_hist):
-    if df_hist.empty:
-        return df
-
-    df_hist = df_hist.sort_values("fecha_hora")
-
-    for _, r in df_hist.iterrows():
-        nip = normalizar_nip(r["nip_afectado"])
-        fecha = pd.Timestamp(r["fecha_turno"])
-
-        mask = (df["nip"] == nip) & (df["fecha"] == fecha)
-
-        if mask.any():
-            df.loc[mask, "turno"] = r["turno_nuevo"]
-        else:
-            df.loc[len(df)] = {
-                "anio": fecha.year,
-                "mes": fecha.month,
-                "fecha": fecha,
-                "dia": fecha.day,
-                "nip": nip,
-                "nombre": r.get("nombre_afectado", ""),
-                "categoria": "",
-                "turno": r["turno_nuevo"],
-            }
-
-    return df
-
-def guardar_csv_en_github(df, ruta_repo):
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{ruta_repo}"
-
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    }
-
-    csv_content = df.to_csv(index=False)
-    content_b64 = base64.b64encode(csv_content.encode()).decode()
-
-    # Comprobar si existe
-    r = requests.get(url, headers=headers)
-
-    sha = None
-    if r.status_code == 200:
-        sha = r.json()["sha"]
-    elif r.status_code not in (200, 404):
-        st.error(f"❌ Error consultando GitHub: {r.status_code} - {r.text}")
-        st.stop()
-
-    payload = {
-        "message": f"Actualiza {ruta_repo}",
-        "content": content_b64,
-        "branch": GITHUB_BRANCH
-    }
-
-    if sha:
-        payload["sha"] = sha
-
-    r = requests.put(url, headers=headers, json=payload)
-
-    if r.status_code not in (200, 201):
-        st.error("❌ Error guardando en GitHub")
-        st.code(r.text)   # 🔥 AHORA VERÁS EL ERROR REAL
-        st.stop()
-
-def cargar_historial_desde_github():
+def historiales_del_anio(anio, mes_actual, df_hist_actual):
     """
-    Descarga historial_cambios.csv desde GitHub y lo devuelve como DataFrame.
-    Si no existe todavía, devuelve DataFrame vacío.
+    (anio, mes, ruta_csv, df_hist) de los meses del año. El historial del
+    mes seleccionado ya está cargado; los demás se refrescan como mucho
+    una vez por minuto. Los meses que GitHub no devuelve se saltan:
+    devuelve (meses, {mes: ErrorGitHub}).
     """
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{HISTORIAL_FILE}"
-
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    }
-
-    r = requests.get(url, headers=headers)
-
-    if r.status_code == 200:
-        content_b64 = r.json()["content"]
-        csv_content = base64.b64decode(content_b64).decode()
-        from io import StringIO
-        return pd.read_csv(
-            StringIO(csv_content),
-            parse_dates=["fecha_turno", "fecha_hora"]
-        )
-
-    # No existe todavía
-    return pd.DataFrame(columns=[
-        "fecha_hora", "usuario_admin", "nip_afectado",
-        "nombre_afectado", "fecha_turno",
-        "turno_anterior", "turno_nuevo", "observaciones"
-    ])
-
-from openpyxl import load_workbook
-
-def excel_a_html(ruta_excel):
-    wb = load_workbook(ruta_excel, data_only=True)
-    ws = wb.active
-
-    html = "<table style='border-collapse:collapse'>"
-
-    for fila in ws.iter_rows():
-        html += "<tr>"
-
-        for celda in fila:
-            valor = "" if celda.value is None else celda.value
-            estilo = "border:1px solid #000;padding:4px;"
-
-            # ---------- FONDO ----------
-            try:
-                if celda.fill and celda.fill.fgColor and celda.fill.fgColor.rgb:
-                    bg = celda.fill.fgColor.rgb
-                    if isinstance(bg, str):
-                        estilo += f"background-color:#{bg[-6:]};"
-            except:
-                pass
-
-            # ---------- TEXTO ----------
-            try:
-                if celda.font:
-                    if celda.font.bold:
-                        estilo += "font-weight:bold;"
-
-                    if celda.font.color and celda.font.color.rgb:
-                        fg = celda.font.color.rgb
-                        if isinstance(fg, str):
-                            estilo += f"color:#{fg[-6:]};"
-            except:
-                pass
-
-            # ---------- ALINEACIÓN ----------
-            try:
-                if celda.alignment and celda.alignment.horizontal:
-                    estilo += f"text-align:{celda.alignment.horizontal};"
-            except:
-                pass
-
-            html += f"<td style='{estilo}'>{valor}</td>"
-
-        html += "</tr>"
-
-    html += "</table>"
-    return html
+    meses, errores = [], {}
+    for anio_mes, mes, ruta in meses_del_anio(anio):
+        if mes == mes_actual:
+            meses.append((anio_mes, mes, ruta, df_hist_actual))
+            continue
+        try:
+            df_hist_mes = persistencia.cargar_historial_mes(
+                anio_mes, mes, GITHUB_TOKEN,
+                refresco_min=max(HISTORIAL_REFRESCO_SEG, PRECARGA_VALIDEZ_SEG)
+            )
+        except persistencia.ErrorGitHub as e:
+            errores[mes] = e
+            continue
+        meses.append((anio_mes, mes, ruta, df_hist_mes))
+    return meses, errores
+
+def historiales_completos(anio, mes_actual, df_hist_actual):
+    """Como historiales_del_anio(), pero falla si falta algún mes."""
+    meses, errores = historiales_del_anio(anio, mes_actual, df_hist_actual)
+    if errores:
+        raise next(iter(errores.values()))
+    return meses
+
+def error_github(e):
+    st.error(f"❌ {e} ({e.status})")
+    st.code(e.texto)   # 🔥 AHORA VERÁS EL ERROR REAL
+    st.stop()
 
 # ==================================================
 # SESIÓN
@@ -259,40 +137,37 @@ if st.session_state.nip is None and "nip" in params:
     st.session_state.nip = params["nip"]
     st.session_state.is_admin = (st.session_state.nip == ADMIN_USER)
 
+# ==================================================
+# DIAGNÓSTICO (TIEMPOS POR ETAPA)
+# ==================================================
+# Activo para el admin, o para todos si hay fichero de log (JSON-lines)
+DIAGNOSTICO_LOG = st.secrets.get("DIAGNOSTICO_LOG")
+diag = Diagnostico(
+    activo=st.session_state.is_admin,
+    ruta_log=DIAGNOSTICO_LOG,
+    previos=st.session_state.pop("diag_previo", None)
+)
+
 # ==================================================
 # LOGIN
 # ==================================================
 if st.session_state.nip is None:
-    with open(ESCUDO_FILE, "rb") as f:
-        escudo = base64.b64encode(f.read()).decode()
-
-    st.markdown(
-        f"<div style='display:flex;justify-content:center'><img src='data:image/png;base64,{escudo}' width='220'></div>",
-        unsafe_allow_html=True
-    )
+    _, centro, _ = st.columns([2, 1, 2])
+    with centro:
+        st.image(imagen(ESCUDO_FILE), width=220)
 
     st.markdown("<h2 style='text-align:center'>🔐 Acceso al cuadrante</h2>", unsafe_allow_html=True)
 
     usuario = st.text_input("Usuario (NIP)")
     password = st.text_input("Contraseña (DNI)", type="password")
 
-    usuarios = pd.read_csv(USERS_FILE)
-    usuarios["nip"] = usuarios["nip"].apply(normalizar_nip)
-
     if st.button("Entrar"):
-        # ---- ADMIN
-        if usuario == ADMIN_USER and password == ADMIN_PASS:
-            st.session_state.nip = ADMIN_USER
-            st.session_state.is_admin = True
-            st.query_params["nip"] = ADMIN_USER
-            st.rerun()
-
-        nip = normalizar_nip(usuario)
-        fila = usuarios[usuarios["nip"] == nip]
+        acceso = credenciales.indice.comprobar(usuario, password)
 
-        if not fila.empty and fila.iloc[0]["dni"] == password:
+        if acceso is not None:
+            nip, es_admin = acceso
             st.session_state.nip = nip
-            st.session_state.is_admin = False
+            st.session_state.is_admin = es_admin
             st.query_params["nip"] = nip
             st.rerun()
 
@@ -303,12 +178,11 @@ if st.session_state.nip is None:
 # ==================================================
 # CABECERA
 # ==================================================
-with open(CABECERA_FILE, "rb") as f:
-    cabecera = base64.b64encode(f.read()).decode()
-
-st.markdown(
-    f"<img src='data:image/png;base64,{cabecera}' style='width:100%;margin-bottom:10px'>",
-    unsafe_allow_html=True
+# Se envía como medio de Streamlit (sólo viaja la URL en cada rerun);
+# en modo móvil, una versión reducida
+st.image(
+    imagen(CABECERA_FILE, ANCHO_MOVIL if st.session_state.get("modo_movil") else None),
+    width="stretch"
 )
 
 st.title("📅 Cuadrante 2026")
@@ -322,21 +196,13 @@ if st.button("🚪 Cerrar sesión"):
 # ==================================================
 # SELECCIÓN DE MES (MES ACTUAL POR DEFECTO)
 # ==================================================
-cuadrantes = listar_cuadrantes()
+with diag.tramo("listar cuadrantes"):
+    cuadrantes = listar_cuadrantes()
 if not cuadrantes:
     st.error("No hay cuadrantes disponibles")
     st.stop()
 
-# 🔹 1. CARGAR TODOS LOS CUADRANTES
-df = cargar_cuadrantes()
-
-# 🔹 2. CARGAR HISTORIAL (DE TODOS LOS MESES)
-df_hist = cargar_historial_desde_github()
-
-# 🔹 3. APLICAR HISTORIAL A TODOS LOS DATOS
-df = aplicar_historial(df, df_hist)
-
-# 🔹 4. SELECCIÓN DE MES (MES ACTUAL POR DEFECTO)
+# 🔹 1. SELECCIÓN DE MES (MES ACTUAL POR DEFECTO)
 hoy = date.today()
 mes_actual_label = f"{MESES[hoy.month]} {hoy.year}"
 
@@ -353,466 +219,196 @@ mes_label = st.selectbox(
     index=default_index
 )
 
-# 🔹 5. FILTRAR MES SELECCIONADO
 anio_txt, anio_num = mes_label.split()
 mes_sel = list(MESES.keys())[list(MESES.values()).index(anio_txt)]
+anio_sel = int(anio_num)
 
-df_mes = df[df["mes"] == mes_sel]
-
-st.success(f"Mostrando cuadrante de {mes_label}")
-
-# ==================================================
-# FESTIVOS
-# ==================================================
-festivos = {date(2026, 1, 1), date(2026, 1, 6), date(2026, 2, 17), date(2026, 3, 19), date(2026, 4, 2), date(2026, 4, 3), date(2026, 5, 1), date(2026, 5, 22)}
-
-def es_festivo(fecha):
-    return fecha in festivos
-
-# ==================================================
-# NOMBRES DE TURNOS
-# ==================================================
-NOMBRES_TURNO = {
-    "1": "Mañana", "2": "Tarde", "3": "Noche", "L": "Laborable",
-    "1ex": "Mañana extra", "2ex": "Tarde extra", "3ex": "Noche extra",
-    "D": "Descanso", "Dc": "Descanso compensado",
-    "Dcv": "Desc. comp. verano", "Dcc": "Desc. comp. curso",
-    "Dct": "Desc. comp. tiro", "Dcj": "Desc. comp. juicio",
-    "Vac": "Vacaciones", "perm": "Permiso", "BAJA": "Baja",
-    "Ts": "Tiempo sindical", "AP": "Asuntos particulares",
-    "JuB": "Juicio Betanzos", "JuC": "Juicio Coruña",
-    "curso": "curso", "indisp": "Indisposición", "EV": "Educación Vial",
-    "Tir": "Tiro", "AGASP": "AGASP", "CU": "Cuadrante", "Dcu": "Desc. comp. cuad." 
-}
-
-def nombre_turno(c):
-    return NOMBRES_TURNO.get(c, c)
-
-# ==================================================
-# ESTILOS DE TURNOS
-# ==================================================
-def estilo_turno(t):
-    if pd.isna(t):
-        return {"bg": "#FFFFFF", "fg": "#000000", "bold": False, "italic": False}
-
-    t = str(t)
-
-    base = {
-        "1": ("#BDD7EE", "#0070C0"),
-        "L": ("#BDD7EE", "#0070C0"),
-        "2": ("#FFE699", "#0070C0"),
-        "3": ("#F8CBAD", "#FF0000"),
-        "1ex": ("#00B050", "#FF0000"),
-        "2ex": ("#00B050", "#FF0000"),
-        "3ex": ("#00B050", "#FF0000"),
-        "D": ("#C6E0B4", "#00B050"),
-        "Dc": ("#C6E0B4", "#00B050"),
-        "Dcv": ("#C6E0B4", "#00B050"),
-        "Dcu": ("#C6E0B4", "#00B050"),
-        "Dcc": ("#C6E0B4", "#00B050"),
-        "Dct": ("#C6E0B4", "#00B050"),
-        "Dcj": ("#C6E0B4", "#00B050"),
-        "Vac": ("#FFFFFF", "#FF0000"),
-        "perm": ("#FFFFFF", "#FF0000"),
-        "indisp": ("#FFFFFF", "#FF0000"),
-        "EV": ("#FFFFFF", "#FF0000"),
-        "curso": ("#FFFFFF", "#FF0000"),
-        "BAJA": ("#FFFFFF", "#FF0000"),
-        "Ts": ("#FFFFFF", "#FF0000"),
-        "Tir": ("#FFFFFF", "#FF0000"),
-        "CU": ("#FFFFFF", "#FF0000"),
-        "indisp": ("#FFFFFF", "#FF0000"),
-        "JuB": ("#FFFFFF", "#FF0000"),
-        "JuC": ("#FFFFFF", "#FF0000"),
-        "1yJuB": ("#BDD7EE", "#FF0000"),
-        "LyJuB": ("#BDD7EE", "#FF0000"),
-        "3yJuC": ("#BDD7EE", "#FF0000"),
-        "2yJuC": ("#BDD7EE", "#FF0000"),
-        "AP": ("#FFFFFF", "#0070C0"),
-        "AGASP": ("#FFFFFF", "#0070C0"),
-        "1y2ex": ("#00B050", "#FF0000"),
-        "2y3ex": ("#00B050", "#FF0000"),
-        "1y3ex": ("#00B050", "#FF0000"),
-        "1|2ex": ("#00B050", "#FF0000"),
-        "1|3ex": ("#00B050", "#FF0000"),
-        "2|1ex": ("#00B050", "#FF0000"),
-        "2|3ex": ("#00B050", "#FF0000"),
-        "3|1ex": ("#00B050", "#FF0000"),
-        "3|2ex": ("#00B050", "#FF0000"),
-        "AP|1ex": ("#00B050", "#FF0000"),
-        "AP|2ex": ("#00B050", "#FF0000"),
-        "AP|3ex": ("#00B050", "#FF0000"),
-    }
-
-    # Turnos dobles normales
-    if t in {"1y2", "1y3", "2y3", "3yJuC", "2yJuC", "1yJuB", "LyJuB", "1ycurso", "2ycurso", "3ycurso"}:
-        return {"bg": "#DBDBDB", "fg": "#FF0000", "bold": True, "italic": False}
-
-    # Turnos dobles con extra
-    if "ex" in t and ("y" in t or "|" in t):
-        return {"bg": "#00B050", "fg": "#FF0000", "bold": True, "italic": False}
-
-    bg, fg = base.get(t, ("#FFFFFF", "#000000"))
+# 🔹 2. CARGAR HISTORIAL (SÓLO EL DEL MES SELECCIONADO)
+try:
+    with diag.tramo("historial (GitHub)"):
+        df_hist = persistencia.cargar_historial_mes(
+            anio_sel, mes_sel, GITHUB_TOKEN, refresco_min=HISTORIAL_REFRESCO_SEG
+        )
+except persistencia.ErrorGitHub as e:
+    error_github(e)
+
+# 🔹 3. CUADRANTE DEL MES CON EL HISTORIAL APLICADO
+#    (snapshot compartido: sólo se aplican los cambios nuevos)
+with diag.tramo("aplicar historial"):
+    df, version_hist = cuadrante_aplicado(df_hist, cuadrantes[mes_label])
+
+# 🔹 4. FILTRAR MES SELECCIONADO (AÑO Y MES)
+df_mes = df[(df["anio"] == anio_sel) & (df["mes"] == mes_sel)]
+
+diag.contar("filas historial", len(df_hist))
+diag.contar("filas cuadrante", len(df_mes))
+
+# Aviso (una vez por código) de turnos que no están en las tablas
+registro.validar(df_mes["turno"].unique())
+
+# 🔹 5. VISTA PREVIA DE LOS CAMBIOS PENDIENTES (ADMIN)
+#    (con vista previa el cuadrante no es el común y no se cachea)
+hay_vista_previa = st.session_state.is_admin and bool(st.session_state.cambios_pendientes)
+
+if hay_vista_previa:
+    df_pendientes = pd.DataFrame(st.session_state.cambios_pendientes)
+    df_pendientes["fecha_hora"] = pd.to_datetime(df_pendientes["fecha_hora"])
+    df_pendientes["fecha_turno"] = pd.to_datetime(df_pendientes["fecha_turno"])
+    df_pendientes = df_pendientes[
+        (df_pendientes["fecha_turno"].dt.year == anio_sel) &
+        (df_pendientes["fecha_turno"].dt.month == mes_sel)
+    ]
 
-    # ---- NEGRITA
-    bold = (
-        t in {"perm", "Ts", "JuB", "JuC", "AP", "AGASP", "Ts", "Vac", "BAJA", "indisp", "curso", "1yJuB", "3yJuC", "2yJuC", "EV", "Tir", "CU"} or
-        "ex" in t or               # cualquier extra
-        t in {"1y2", "1y3", "2y3", "1ycurso", "2ycurso", "3ycurso"}
+    df_mes = aplicar_historial(df_mes.copy(), df_pendientes)
+
+# 🔹 6. PRECARGA DE LOS MESES VECINOS (EN SEGUNDO PLANO)
+pos_mes = opciones_mes.index(mes_label)
+vecinos = []
+
+for pos in (pos_mes - 1, pos_mes + 1):
+    if 0 <= pos < len(opciones_mes):
+        mes_txt, anio_txt_vecino = opciones_mes[pos].split()
+        vecinos.append((
+            int(anio_txt_vecino),
+            list(MESES.values()).index(mes_txt) + 1,
+            cuadrantes[opciones_mes[pos]]
+        ))
+
+with diag.tramo("precarga vecinos"):
+    precargar_meses(
+        vecinos,
+        lambda anio, mes: persistencia.cargar_historial_mes(
+            anio, mes, GITHUB_TOKEN, refresco_min=HISTORIAL_REFRESCO_SEG
+        )
     )
 
-    # ---- CURSIVA
-    italic = t in {"Vac", "BAJA"}
-
-    return {
-        "bg": bg,
-        "fg": fg,
-        "bold": bold,
-        "italic": italic
-    }
+st.success(f"Mostrando cuadrante de {mes_label}")
 
 # ==================================================
 # PESTAÑAS
 # ==================================================
+# Con key y on_change="rerun" cada pestaña sabe si está abierta (.open),
+# y el resumen sólo carga los historiales del año cuando se mira
 if st.session_state.is_admin:
     tab_general, tab_mis_turnos, tab_resumen, tab_historial = st.tabs(
-        ["📋 Cuadrante general", "📆 Mis turnos", "📊 Resumen", "📜 Historial"]
+        ["📋 Cuadrante general", "📆 Mis turnos", "📊 Resumen", "📜 Historial"],
+        key="pestaña", on_change="rerun"
     )
 else:
     tab_general, tab_mis_turnos, tab_resumen = st.tabs(
-        ["📋 Cuadrante general", "📆 Mis turnos", "📊 Resumen"]
+        ["📋 Cuadrante general", "📆 Mis turnos", "📊 Resumen"],
+        key="pestaña", on_change="rerun"
     )
 
 # ==================================================
 # TAB 1 — CUADRANTE GENERAL (MODO MÓVIL + ZOOM)
 # ==================================================
-with tab_general:
+with tab_general, diag.tramo("pestaña general"):
     st.subheader("📋 Cuadrante general")
 
-    modo_movil = st.checkbox("📱 Modo móvil")
+    modo_movil = st.checkbox("📱 Modo móvil", key="modo_movil")
 
     zoom = 1.0
     if modo_movil:
         zoom = st.slider("🔍 Zoom", 0.3, 1.5, 0.5, 0.05)
 
-    # ---------- CUADRANTE ----------
-    if modo_movil:
-        index_cols = ["nip"]
-        orden = df_mes["nip"].drop_duplicates()
-    else:
-        index_cols = ["nombre", "categoria", "nip"]
-        orden = df_mes[index_cols].drop_duplicates()
-
-    tabla = (
-        df_mes
-        .pivot_table(
-            index=index_cols,
-            columns="dia",
-            values="turno",
-            aggfunc="first"
-        )
-        .reindex(orden)
-    )
-
     nip_usuario = st.session_state.nip
 
     hoy = date.today()
-    es_hoy_mes = (hoy.year == 2026 and hoy.month == mes_sel)
+    es_hoy_mes = (hoy.year == anio_sel and hoy.month == mes_sel)
     dia_hoy = hoy.day if es_hoy_mes else None
 
-    # ---------- HTML + CSS ----------
-    html = f"""
-    <style>
-        .wrapper {{
-            transform: scale({zoom});
-            transform-origin: top left;
-            width: fit-content;
-        }}
-
-        table {{
-            border-collapse: collapse;
-            font-size: 16px;
-        }}
-
-        th, td {{
-            border: 1px solid #000;
-            padding: 6px;
-            text-align: center;
-            white-space: nowrap;
-        }}
-
-        td {{
-            font-weight: 600;
-        }}
-
-        /* CABECERA FIJA */
-        thead th {{
-            position: sticky;
-            top: 0;
-            z-index: 10;
-            background: #111;
-            color: white;
-        }}
-
-        /* SOLO CELDA DEL DÍA ACTUAL */
-        .th-hoy {{
-            background: #00B0F0 !important;
-            color: #000 !important;
-            font-weight: bold;
-        }}
-
-        /* FILA USUARIO */
-        tr.usuario td {{
-            border-top: 3px solid #000 !important;
-            border-bottom: 3px solid #000 !important;
-        }}
-
-        tr.usuario td:first-child {{
-            border-left: 3px solid #000 !important;
-        }}
-
-        tr.usuario td:last-child {{
-            border-right: 3px solid #000 !important;
-        }}
-    </style>
-
-    <div style="overflow:auto; max-height:75vh">
-      <div class="wrapper">
-        <table>
-          <thead>
-            <tr>
-    """
-
-    if modo_movil:
-        html += "<th>NIP</th>"
-    else:
-        html += "<th>Nombre y apellidos</th><th>Categoría</th><th>NIP</th>"
-
-    for d in tabla.columns:
-        fecha = date(2026, mes_sel, d)
-        clase_hoy = "th-hoy" if dia_hoy == d else ""
-
-        if es_festivo(fecha) or fecha.weekday() == 6:
-            html += f"<th class='{clase_hoy}' style='background:#92D050;color:#FF0000'>{d}</th>"
-        else:
-            html += f"<th class='{clase_hoy}'>{d}</th>"
-
-    html += """
-            </tr>
-          </thead>
-          <tbody>
-    """
-
-    # ---------- FILAS DEL CUADRANTE ----------
-    for idx, fila in tabla.iterrows():
-
-        nip_fila = str(idx) if modo_movil else idx[2]
-        clase_usuario = "usuario" if nip_fila == nip_usuario else ""
-
-        html += f"<tr class='{clase_usuario}'>"
-
-        if modo_movil:
-            html += f"<td>{nip_fila}</td>"
-        else:
-            nombre, cat, nip = idx
-            html += f"<td>{nombre}</td><td>{cat}</td><td>{nip}</td>"
-
-        for v in fila:
-            e = estilo_turno(v)
-            txt = "" if pd.isna(v) else v
-
-            html += (
-                f"<td style='background:{e['bg']};"
-                f"color:{e['fg']};"
-                f"font-weight:{'bold' if e.get('bold') else 'normal'};"
-                f"font-style:{'italic' if e.get('italic') else 'normal'}'>"
-                f"{txt}</td>"
-            )
-
-        html += "</tr>"
-
-    # ---------- CONTEO 1 / 2 / 3 ----------
-    def contar_123(codigo):
-        if pd.isna(codigo):
-            return set()
-
-        c = str(codigo)
-        NO_CUENTAN = ["D","Vac","BAJA","perm","Ts","Dc","Dct","Dcc","Dcv","curso","indisp"]
-        if any(x in c for x in NO_CUENTAN):
-            return set()
-
-        res = set()
-        if "1" in c: res.add("1")
-        if "2" in c: res.add("2")
-        if "3" in c: res.add("3")
-        return res
-
-    conteo_1, conteo_2, conteo_3 = [], [], []
-
-    for dia in tabla.columns:
-        c1 = c2 = c3 = 0
-        for _, fila in tabla.iterrows():
-            t = contar_123(fila[dia])
-            c1 += "1" in t
-            c2 += "2" in t
-            c3 += "3" in t
-
-        conteo_1.append(c1)
-        conteo_2.append(c2)
-        conteo_3.append(c3)
-
-    def fila_resumen(titulo, datos, color):
-        fila = "<tr>"
-        fila += f"<td colspan='{'1' if modo_movil else '3'}' style='background:{color};color:#000;font-weight:bold'>{titulo}</td>"
-        for v in datos:
-            fila += f"<td style='background:{color};color:#000;font-weight:bold'>{v}</td>"
-        return fila + "</tr>"
-
-    html += fila_resumen("Mañanas", conteo_1, "#BDD7EE")
-    html += fila_resumen("Tardes", conteo_2, "#FFE699")
-    html += fila_resumen("Noches", conteo_3, "#F8CBAD")
-
-    html += """
-          </tbody>
-        </table>
-      </div>
-    </div>
-    """
+    # ---------- HTML (CACHÉ COMPARTIDA ENTRE SESIONES) ----------
+    cuadro = cuadrante_general(
+        df_mes, anio_sel, mes_sel, modo_movil,
+        version=None if hay_vista_previa else version_hist,
+        es_festivo=es_festivo
+    )
+    html = html_cuadrante_usuario(cuadro, nip_usuario, dia_hoy=dia_hoy, zoom=zoom)
 
     st.markdown(html, unsafe_allow_html=True)
+    diag.contar("bytes HTML", len(html.encode("utf-8")))
+
+    if st.session_state.is_admin:
+        st.caption(f"📦 Tamaño del HTML del cuadrante: {tamano_html(html):.1f} KB")
+
+        # ---------- EXPORTAR A EXCEL (FORMATO DE LA PLANTILLA) ----------
+        # El libro se genera al pulsar (en otro hilo), no en cada rerun,
+        # y sin los cambios pendientes de la vista previa
+        col_excel_mes, col_excel_anio = st.columns(2)
+        col_excel_mes.download_button(
+            "⬇️ Excel del mes",
+            data=lambda: exportar_bytes(
+                [(anio_sel, mes_sel, df[(df["anio"] == anio_sel) & (df["mes"] == mes_sel)])]
+            ),
+            file_name=nombre_fichero(anio_sel, mes_sel),
+            mime=MIME_XLSX,
+            on_click="ignore",
+        )
+        col_excel_anio.download_button(
+            f"⬇️ Excel de {anio_sel}",
+            data=lambda: exportar_bytes(
+                meses_aplicados(historiales_completos(anio_sel, mes_sel, df_hist))
+            ),
+            file_name=nombre_fichero(anio_sel),
+            mime=MIME_XLSX,
+            on_click="ignore",
+        )
 
 # ==================================================
 # TAB 2 — MIS TURNOS
 # ==================================================
-with tab_mis_turnos:
+with tab_mis_turnos, diag.tramo("pestaña mis turnos"):
     st.subheader("📆 Mis turnos")
 
     df_user = df_mes[df_mes["nip"] == st.session_state.nip]
-    cal = calendar.Calendar()
 
-    # -------------------------------
-    # FUNCIONES AUXILIARES
-    # -------------------------------
-    def separar(turno):
-        if pd.isna(turno):
-            return []
-        if "y" in turno:
-            return turno.split("y")
-        if "|" in turno:
-            return turno.split("|")
-        return [turno]
-
-    def formatear_nombre(nombre):
-        partes = nombre.split()
-        if partes[0] in {"Iago", "Javier"} and len(partes) > 1:
-            return f"{partes[0]} {partes[1][0]}."
-        return partes[0]
-
-    def extraer_franjas(turno):
-        """
-        Devuelve un set con {'1','2','3'} según el turno,
-        incluyendo extras y combinados.
-        """
-        if pd.isna(turno):
-            return set()
-
-        t = str(turno)
-
-        NO_CUENTAN = [
-            "D","Vac","BAJA","perm","AP","Ts",
-            "Dc","Dct","Dcc","Dcv","JuB","JuC",
-            "curso","indisp"
-        ]
-
-        if any(x in t for x in NO_CUENTAN):
-            return set()
-
-        franjas = set()
-        if "1" in t:
-            franjas.add("1")
-        if "2" in t:
-            franjas.add("2")
-        if "3" in t:
-            franjas.add("3")
-
-        return franjas
-
-    def compañeros(fecha, turno_usuario):
-        """
-        Devuelve los compañeros que coinciden
-        en alguna franja del turno del usuario
-        (incluye extras)
-        """
-        franjas_usuario = extraer_franjas(turno_usuario)
-
-        if not franjas_usuario:
-            return []
-
-        df_dia = df_mes[
-            (df_mes["fecha"] == fecha) &
-            (df_mes["nip"] != st.session_state.nip)
-        ]
-
-        resultado = []
-
-        for _, r in df_dia.iterrows():
-            franjas_otro = extraer_franjas(r["turno"])
-            if franjas_usuario & franjas_otro:
-                resultado.append(formatear_nombre(r["nombre"]))
-
-        return resultado
+    # Índice (fecha, franja) -> compañeros, uno por mes y versión del historial
+    indice = indice_compañeros(df_mes, version=None if hay_vista_previa else version_hist)
 
-    hoy = date.today()
-    es_hoy_mes = (hoy.year == 2026 and hoy.month == mes_sel)
-    dia_hoy = hoy.day if es_hoy_mes else None
+    # Turno de cada día (primera fila si hubiera varias)
+    dias_user = df_user.drop_duplicates("fecha")
+    turnos_dia = dict(zip(dias_user["fecha"].dt.date, dias_user["turno"]))
 
     # -------------------------------
-    # CALENDARIO
+    # CALENDARIO (UN ÚNICO BLOQUE HTML)
     # -------------------------------
-    for semana in cal.monthdatescalendar(2026, mes_sel):
-        cols = st.columns(7)
-
-        for i, d in enumerate(semana):
-            with cols[i]:
-                if d.month != mes_sel:
-                    st.write("")
-                    continue
-
-                fila = df_user[df_user["fecha"] == pd.Timestamp(d)]
-
-                es_hoy = (dia_hoy == d.day)
-
-                fondo_hoy = "background:#00B0F0;color:#000;" if es_hoy else ""
-
-                html = (
-                    "<div style='border:1px solid #999;"
-                    f"{fondo_hoy}"
-                    "text-align:center;"
-                    "padding:4px'>"
-                    f"<b>{d.day}</b><br>"
-                )
-
-                if not fila.empty:
-                    turno_dia = str(fila.iloc[0]["turno"])
-                    for p in separar(turno_dia):
-                        e = estilo_turno(p)
-                        html += (
-                            f"<div style='background:{e['bg']};"
-                            f"color:{e['fg']};"
-                            f"text-align:center'>"
-                            f"<b>{nombre_turno(p)}</b><br>"
-                        )
+    html_cal = html_calendario(anio_sel, mes_sel, turnos_dia, indice, st.session_state.nip, dia_hoy=dia_hoy)
+    st.markdown(html_cal, unsafe_allow_html=True)
+    diag.contar("bytes HTML", len(html_cal.encode("utf-8")))
 
-                        comps = compañeros(pd.Timestamp(d), p)
-                        for c in comps:
-                            html += f"{c}<br>"
-
-                        html += "</div>"
+    # -------------------------------
+    # CALENDARIOS DE TODOS EN PDF (ADMIN)
+    # -------------------------------
+    # Se generan en un hilo en segundo plano, sin la vista previa
+    if st.session_state.is_admin:
+        st.markdown("---")
+        st.markdown("**🖨️ Calendarios de toda la plantilla en PDF**")
 
-                html += "</div>"
-                st.markdown(html, unsafe_allow_html=True)
+        pdf_combinado = st.checkbox("Un único PDF (una página por trabajador)", key="pdf_combinado")
+        clave_pdf = (anio_sel, mes_sel, version_hist, pdf_combinado)
+        trabajo_pdf = calendarios.trabajo(clave_pdf)
 
-        st.markdown("<div style='height:25px'></div>", unsafe_allow_html=True)
+        if st.button("🖨️ Generar calendarios", disabled=trabajo_pdf is not None and not trabajo_pdf.done()):
+            calendarios.lanzar(
+                anio_sel, mes_sel, df[(df["anio"] == anio_sel) & (df["mes"] == mes_sel)],
+                version_hist, pdf_combinado
+            )
+            trabajo_pdf = calendarios.trabajo(clave_pdf)
+
+        if trabajo_pdf is not None and not trabajo_pdf.done():
+            st.info("⏳ Generando los calendarios…")
+            st.button("🔄 Comprobar")
+        elif trabajo_pdf is not None and trabajo_pdf.exception() is not None:
+            st.error(f"❌ Error generando los calendarios: {trabajo_pdf.exception()}")
+        elif trabajo_pdf is not None:
+            st.download_button(
+                "⬇️ Descargar calendarios",
+                data=trabajo_pdf.result(),
+                file_name=calendarios.nombre_fichero(anio_sel, mes_sel, pdf_combinado),
+                mime=calendarios.MIME_PDF if pdf_combinado else calendarios.MIME_ZIP,
+                on_click="ignore",
+            )
 
 # ==================================================
 # PANEL DE EDICIÓN (SOLO ADMIN)
@@ -822,6 +418,13 @@ if st.session_state.is_admin:
     st.markdown("---")
     st.subheader("🛠️ Edición de turnos (ADMIN)")
 
+    # ---- Estado de la subida a GitHub (segundo plano)
+    subiendo = persistencia.escritura.pendientes()
+    if subiendo:
+        st.info(f"⏳ Subiendo {len(subiendo)} cambio(s) a GitHub…")
+    if persistencia.escritura.ultimo_error:
+        st.warning(f"⚠️ Reintentando la subida a GitHub: {persistencia.escritura.ultimo_error}")
+
     # ---- Selección de trabajador
     df_trab = (
         df_mes[["nombre", "nip"]]
@@ -849,18 +452,6 @@ if st.session_state.is_admin:
             sorted(df_mes["dia"].unique())
         )
 
-    TURNOS_EDITABLES = [
-        "1", "2", "3", "L",
-        "1ex", "2ex", "3ex",
-        "D", "Dc", "Dcv", "Dcc", "Dct", "Dcj",
-        "Vac", "BAJA", "perm", "Ts", "AP",
-        "JuB", "JuC", "curso", "indisp",
-        "1y2", "1y3", "2y3",
-        "1y2ex", "1y3ex", "2y3ex",
-        "1|2ex", "1|3ex", "2|1ex", "2|3ex", "3|1ex", "3|2ex", "L|2ex", "L|3ex",
-        "1yJuB", "LyJuB", "AP|1ex", "AP|2ex", "AP|3ex", "3yJuC", "EV", "Tir",
-        "1ycurso", "2ycurso", "3ycurso", "Tir|2ex", "Tir|3ex", "2yJuC"
-    ]
 
     with col3:
         turno_sel = st.selectbox("🔁 Nuevo turno", TURNOS_EDITABLES)
@@ -869,24 +460,24 @@ if st.session_state.is_admin:
             placeholder="Ej.: Cambio por enfermedad, ajuste de servicio…"
         )
 
-    # ---- Guardar cambio
-    if st.button("💾 Guardar cambio"):
-        fecha_sel = date(2026, mes_sel, dia_sel)
+    def registro_cambio():
+        fecha_sel = date(anio_sel, mes_sel, dia_sel)
 
+        # df_mes ya incluye los cambios pendientes de la cola
         mask = (
-            (df["nip"] == nip_sel) &
-            (df["fecha"] == pd.Timestamp(fecha_sel))
+            (df_mes["nip"] == nip_sel) &
+            (df_mes["fecha"] == pd.Timestamp(fecha_sel))
         )
 
         if mask.any():
-            turno_anterior = df.loc[mask, "turno"].iloc[0]
-            nombre_afectado = df.loc[mask, "nombre"].iloc[0]
+            turno_anterior = df_mes.loc[mask, "turno"].iloc[0]
+            nombre_afectado = df_mes.loc[mask, "nombre"].iloc[0]
         else:
             turno_anterior = ""
             fila_base = df_mes[df_mes["nip"] == nip_sel].iloc[0]
             nombre_afectado = fila_base["nombre"]
 
-        registro = {
+        return {
             "fecha_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "usuario_admin": st.session_state.nip,
             "nip_afectado": normalizar_nip(nip_sel),
@@ -897,258 +488,386 @@ if st.session_state.is_admin:
             "observaciones": observaciones.strip()
         }
 
-        try:
-            df_hist = pd.read_csv(HISTORIAL_FILE)
-            df_hist = pd.concat(
-                [df_hist, pd.DataFrame([registro])],
-                ignore_index=True
-            )
-        except FileNotFoundError:
-            df_hist = pd.DataFrame([registro])
+    col_guardar, col_cola = st.columns(2)
 
-        guardar_csv_en_github(df_hist, "historial_cambios.csv")
+    # ---- Guardar cambio
+    with col_guardar:
+        if st.button("💾 Guardar cambio"):
+            with diag.tramo("guardar (cola)"):
+                persistencia.escritura.encolar([registro_cambio()])
+
+            st.success("✅ Turno actualizado y guardado en el historial")
+            diag.antes_de_rerun(st.session_state)
+            st.rerun()
 
-        st.success("✅ Turno actualizado y guardado en el historial")
-        st.rerun()
+    # ---- Añadir a la cola (se guardan todos juntos)
+    with col_cola:
+        if st.button("➕ Añadir a la cola"):
+            st.session_state.cambios_pendientes.append(registro_cambio())
+            st.rerun()
+
+    # ---- Cola de cambios pendientes
+    pendientes = st.session_state.cambios_pendientes
+
+    if pendientes:
+        st.markdown(f"#### 🧾 Cambios pendientes ({len(pendientes)})")
+        st.caption("Ya se ven aplicados en el cuadrante, pero todavía no están guardados.")
+
+        st.dataframe(
+            pd.DataFrame(pendientes)[[
+                "nombre_afectado", "fecha_turno",
+                "turno_anterior", "turno_nuevo", "observaciones"
+            ]],
+            use_container_width=True,
+            hide_index=True
+        )
+
+        col_confirmar, col_vaciar = st.columns(2)
+
+        with col_confirmar:
+            if st.button(f"✅ Guardar los {len(pendientes)} cambios"):
+                with diag.tramo("guardar (cola)"):
+                    persistencia.escritura.encolar(pendientes)
+
+                st.session_state.cambios_pendientes = []
+                diag.antes_de_rerun(st.session_state)
+                st.rerun()
+
+        with col_vaciar:
+            if st.button("🗑️ Vaciar la cola"):
+                st.session_state.cambios_pendientes = []
+                st.rerun()
 
 # ==================================================
 # TAB HISTORIAL — SOLO ADMIN (EDITAR / ELIMINAR)
 # ==================================================
 if st.session_state.is_admin:
-    with tab_historial:
+    with tab_historial, diag.tramo("pestaña historial"):
         st.subheader("📜 Historial de cambios del cuadrante")
 
-        if not os.path.exists(HISTORIAL_FILE):
-            st.info("Todavía no hay cambios registrados en el historial.")
-            st.stop()
-
-        df_hist = pd.read_csv(HISTORIAL_FILE)
-        df_hist["fecha_hora"] = pd.to_datetime(df_hist["fecha_hora"])
-        df_hist = df_hist.sort_values("fecha_hora", ascending=False).reset_index(drop=True)
+        if df_hist.empty:
+            st.info("Todavía no hay cambios registrados en el historial de este mes.")
 
-        st.dataframe(df_hist, use_container_width=True, hide_index=True)
-
-        st.markdown("---")
-        st.subheader("✏️ Editar o eliminar registro")
+        else:
+            # Se ordena sólo para mostrar: se guarda en el orden original
+            df_hist_vista = df_hist.sort_values("fecha_hora", ascending=False)
 
-        # ----- Selección de registro
-        opciones = {
-            f"{row['fecha_hora']} | {row['nombre_afectado']} | {row['fecha_turno']}":
-            i
-            for i, row in df_hist.iterrows()
-        }
+            st.dataframe(df_hist_vista, use_container_width=True, hide_index=True)
 
-        seleccion = st.selectbox(
-            "Selecciona un registro",
-            options=list(opciones.keys())
-        )
+            st.markdown("---")
+            st.subheader("✏️ Editar o eliminar registro")
 
-        idx = opciones[seleccion]
-        registro = df_hist.loc[idx]
-
-        # ----- Campos editables
-        nuevo_turno = st.text_input(
-            "🔁 Turno nuevo",
-            value=registro["turno_nuevo"]
-        )
+            # ----- Selección de registro
+            opciones = {
+                f"{row['fecha_hora']} | {row['nombre_afectado']} | {row['fecha_turno']}":
+                i
+                for i, row in df_hist_vista.iterrows()
+            }
 
-        nuevas_obs = st.text_input(
-            "📝 Observaciones",
-            value=str(registro.get("observaciones", ""))
-        )
+            seleccion = st.selectbox(
+                "Selecciona un registro",
+                options=list(opciones.keys())
+            )
 
-        col1, col2 = st.columns(2)
+            idx = opciones[seleccion]
+            fila_hist = df_hist.loc[idx]
 
-        # ----- BOTÓN GUARDAR CAMBIOS
-        with col1:
-            if st.button("💾 Guardar cambios"):
-                df_hist.loc[idx, "turno_nuevo"] = nuevo_turno
-                df_hist.loc[idx, "observaciones"] = nuevas_obs
-                guardar_csv_en_github(df_hist, "historial_cambios.csv")
-                st.success("✅ Registro actualizado correctamente")
-                st.rerun()
+            # ----- Campos editables
+            nuevo_turno = st.text_input(
+                "🔁 Turno nuevo",
+                value=fila_hist["turno_nuevo"]
+            )
 
-        # ----- BOTÓN ELIMINAR REGISTRO
-        with col2:
-            if st.button("🗑️ Eliminar registro"):
-                df_hist = df_hist.drop(index=idx).reset_index(drop=True)
-                guardar_csv_en_github(df_hist, "historial_cambios.csv")
+            nuevas_obs = st.text_input(
+                "📝 Observaciones",
+                value=str(fila_hist.get("observaciones", ""))
+            )
 
-                st.warning("🗑️ Registro eliminado del historial")
-                st.rerun()
+            col1, col2 = st.columns(2)
+
+            # ----- BOTÓN GUARDAR CAMBIOS
+            with col1:
+                if st.button("💾 Guardar cambios"):
+                    try:
+                        with diag.tramo("guardar historial (GitHub)"):
+                            persistencia.editar_historial_mes(
+                                anio_sel, mes_sel, persistencia.clave_registro(df_hist, idx),
+                                {"turno_nuevo": nuevo_turno, "observaciones": nuevas_obs}, GITHUB_TOKEN
+                            )
+                    except persistencia.ErrorGitHub as e:
+                        st.error(f"❌ No se ha podido guardar: {e}")
+                    else:
+                        st.success("✅ Registro actualizado correctamente")
+                        diag.antes_de_rerun(st.session_state)
+                        st.rerun()
+
+            # ----- BOTÓN ELIMINAR REGISTRO
+            with col2:
+                if st.button("🗑️ Eliminar registro"):
+                    try:
+                        with diag.tramo("guardar historial (GitHub)"):
+                            persistencia.editar_historial_mes(
+                                anio_sel, mes_sel, persistencia.clave_registro(df_hist, idx), None, GITHUB_TOKEN
+                            )
+                    except persistencia.ErrorGitHub as e:
+                        st.error(f"❌ No se ha podido eliminar: {e}")
+                    else:
+                        st.warning("🗑️ Registro eliminado del historial")
+                        diag.antes_de_rerun(st.session_state)
+                        st.rerun()
 
 # ==================================================
 # TAB RESUMEN
 # ==================================================
-with tab_resumen:
+with tab_resumen, diag.tramo("pestaña resumen"):
     st.subheader("📊 Resumen personal")
 
-    ruta_csv = f"resumenes_csv/2026/{st.session_state.nip}.csv"
-
-    if not os.path.exists(ruta_csv):
-        st.warning("⚠️ No existe un resumen para este trabajador.")
-
-    else:
-
-        try:
-
-            # ============================================
-            # LECTURA DEL CSV
-            # ============================================
-            with open(ruta_csv, encoding="utf-8") as f:
-                filas = [
-                    linea.rstrip("\n").split(",")
-                    for linea in f
-                ]
-
-            # Si el archivo está vacío
-            if not filas:
-                st.warning("⚠️ El archivo de resumen está vacío.")
-                st.stop()
-
-            # ============================================
-            # IGUALAR TODAS LAS FILAS
-            # ============================================
-            max_cols = max(len(fila) for fila in filas)
-
-            for fila in filas:
-                while len(fila) < max_cols:
-                    fila.append("")
-
-            df_resumen = pd.DataFrame(filas)
-
-            # ============================================
-            # FILAS QUE VAN EN AZUL CLARO
-            # ============================================
-            filas_azules = {
-                1,
-                3,
-                5,
-                7,
-                9,
-                11,
-                13,
-                15,
-                17,
-                19,
-                21,
-                23
-            }
-
-            # ============================================
-            # HTML + CSS
-            # ============================================
-            html = """
-            <style>
-
-            /* CONTENEDOR GENERAL */
-            .resumen {
-                background: #FFFFFF;
-                color: #000000;
-                width: 100%;
-                overflow-x: auto;
-            }
+    # ============================================
+    # RESUMEN DEL AÑO (CUADRANTE + HISTORIAL)
+    # ============================================
+    # Sólo con la pestaña abierta: son un historial por mes del año
+    filas = None
+    if tab_resumen.open:
+        meses_anio, errores = historiales_del_anio(anio_sel, mes_sel, df_hist)
+        if errores:
+            st.warning(
+                "⚠️ No se ha podido cargar el historial de "
+                + ", ".join(MESES[m] for m in sorted(errores))
+                + ": esos meses sólo muestran lo que tenga el resumen guardado."
+            )
 
-            /* TABLA */
-            .resumen table {
-                border-collapse: collapse;
-                width: 100%;
-                font-size: 15px;
-                background: #FFFFFF;
-            }
+        resumen_todos, meses_con_datos = resumen_anual(meses_anio)
 
-            /* TODAS LAS CELDAS */
-            .resumen td {
-                border: 1px solid #000000;
-                padding: 6px;
-                text-align: center;
-                color: #000000;
-            }
+        # Los cupos ("21/54"), ferias, jefaturas y horas salen del resumen guardado
+        ruta_csv = ruta_resumen(anio_sel, st.session_state.nip)
+        filas = tabla_personal(
+            resumen_todos, meses_con_datos, st.session_state.nip, resumen_guardado(ruta_csv)
+        )
 
-            /* ENCABEZADO */
-            .resumen tr.resumen-header td {
-                background: #000000 !important;
-                color: #FFFFFF !important;
-                font-weight: bold;
-                border: 1px solid #000000;
-            }
+    if filas is not None:
 
-            /* FILAS AZULES */
-            .resumen tr.resumen-azul td {
-                background: #DDEBF7 !important;
-                color: #000000 !important;
-            }
+        if len(filas) == 1:
+            st.warning("⚠️ No existe un resumen para este trabajador.")
 
-            /* FILAS BLANCAS */
-            .resumen tr.resumen-blanco td {
-                background: #FFFFFF !important;
-                color: #000000 !important;
-            }
+        else:
 
-            /* PRIMERA COLUMNA */
-            .resumen tr.resumen-azul td:first-child,
-            .resumen tr.resumen-blanco td:first-child {
-                font-weight: bold;
-            }
+            try:
 
-            /* COLUMNA TOTAL */
-            .resumen td.total {
-                font-weight: bold;
-            }
+                df_resumen = pd.DataFrame(filas)
+
+                # ============================================
+                # FILAS QUE VAN EN AZUL CLARO
+                # ============================================
+                filas_azules = {
+                    1,
+                    3,
+                    5,
+                    7,
+                    9,
+                    11,
+                    13,
+                    15,
+                    17,
+                    19,
+                    21,
+                    23
+                }
+
+                # ============================================
+                # HTML + CSS
+                # ============================================
+                html = """
+                <style>
+
+                /* CONTENEDOR GENERAL */
+                .resumen {
+                    background: #FFFFFF;
+                    color: #000000;
+                    width: 100%;
+                    overflow-x: auto;
+                }
+
+                /* TABLA */
+                .resumen table {
+                    border-collapse: collapse;
+                    width: 100%;
+                    font-size: 15px;
+                    background: #FFFFFF;
+                }
+
+                /* TODAS LAS CELDAS */
+                .resumen td {
+                    border: 1px solid #000000;
+                    padding: 6px;
+                    text-align: center;
+                    color: #000000;
+                }
+
+                /* ENCABEZADO */
+                .resumen tr.resumen-header td {
+                    background: #000000 !important;
+                    color: #FFFFFF !important;
+                    font-weight: bold;
+                    border: 1px solid #000000;
+                }
+
+                /* FILAS AZULES */
+                .resumen tr.resumen-azul td {
+                    background: #DDEBF7 !important;
+                    color: #000000 !important;
+                }
+
+                /* FILAS BLANCAS */
+                .resumen tr.resumen-blanco td {
+                    background: #FFFFFF !important;
+                    color: #000000 !important;
+                }
+
+                /* PRIMERA COLUMNA */
+                .resumen tr.resumen-azul td:first-child,
+                .resumen tr.resumen-blanco td:first-child {
+                    font-weight: bold;
+                }
+
+                /* COLUMNA TOTAL */
+                .resumen td.total {
+                    font-weight: bold;
+                }
+
+                </style>
+
+                <div class="resumen">
+                <table>
+                """
+
+                # ============================================
+                # CONSTRUIR FILAS
+                # ============================================
+                for indice, fila in df_resumen.iterrows():
+
+                    # ---------- CLASE DE LA FILA ----------
+                    if indice == 0:
+                        html += "<tr class='resumen-header'>"
+
+                    elif indice in filas_azules:
+                        html += "<tr class='resumen-azul'>"
 
-            </style>
+                    else:
+                        html += "<tr class='resumen-blanco'>"
+
+                    # ---------- CELDAS ----------
+                    for col_idx, valor in enumerate(fila):
+
+                        if pd.isna(valor):
+                            valor = ""
+
+                        valor = str(valor)
+
+                        # Última columna = Total
+                        if col_idx == len(fila) - 1:
+                            html += (
+                                f"<td class='total'>{valor}</td>"
+                            )
+                        else:
+                            html += (
+                                f"<td>{valor}</td>"
+                            )
+
+                    html += "</tr>"
+
+                # ============================================
+                # CIERRE
+                # ============================================
+                html += """
+                </table>
+                </div>
+                """
+
+                st.markdown(
+                    html,
+                    unsafe_allow_html=True
+                )
+                diag.contar("bytes HTML", len(html.encode("utf-8")))
 
-            <div class="resumen">
-            <table>
-            """
+            except Exception as e:
+                st.error(f"Error leyendo el resumen: {e}")
 
-            # ============================================
-            # CONSTRUIR FILAS
-            # ============================================
-            for indice, fila in df_resumen.iterrows():
+# ==================================================
+# IMPORTAR CUADRANTES (SOLO ADMIN)
+# ==================================================
+if st.session_state.is_admin:
+    with st.expander("📥 Importar cuadrantes desde Excel"):
+        st.caption('Libros como "01 - Cuadrante Enero 2026.xlsx": se importa cada hoja "<Mes> <Año>".')
+        libro = st.file_uploader("Cuadrante mensual", type="xlsx", key="importar_libro")
+        sobrescribir = st.checkbox("Reemplazar los meses que ya existen", key="importar_sobrescribir")
 
-                # ---------- CLASE DE LA FILA ----------
-                if indice == 0:
-                    html += "<tr class='resumen-header'>"
+        if libro is not None and st.checkbox("👁️ Vista previa", key="importar_vista_previa"):
+            try:
+                hojas = hojas_excel(libro)
+                c1, c2 = st.columns([3, 1])
+                with c1:
+                    hoja = st.selectbox("Hoja", list(hojas), key="importar_hoja")
+                paginas = max(1, -(-hojas[hoja] // FILAS_VISTA_PREVIA))
+                with c2:
+                    pagina = st.number_input("Página", 1, paginas, 1, key="importar_pagina")
+
+                with diag.tramo("vista previa excel"):
+                    html = excel_a_html(libro, hoja, (pagina - 1) * FILAS_VISTA_PREVIA, FILAS_VISTA_PREVIA)
+                st.caption(f"{hojas[hoja]} filas · página {pagina} de {paginas} · {tamano_html(html):.0f} KB")
+                st.markdown(f"<div style='overflow:auto; max-height:60vh'>{html}</div>", unsafe_allow_html=True)
+            except Exception as e:
+                st.error(f"Error leyendo el libro: {e}")
+
+        if libro is not None and st.button("📥 Importar"):
+            try:
+                with diag.tramo("importar excel"):
+                    resultados = importar.importar(libro, CUADRANTES_DIR, sobrescribir)
+            except Exception as e:
+                st.error(f"Error leyendo el libro: {e}")
+                resultados = []
+
+            for r in resultados:
+                etiqueta = f"{MESES[r['mes']]} {r['anio']}"
+                if not r["escrito"]:
+                    st.info(f"{etiqueta}: ya existe, no se ha importado")
+                    continue
 
-                elif indice in filas_azules:
-                    html += "<tr class='resumen-azul'>"
+                try:
+                    persistencia.guardar_csv_en_github(
+                        r["csv"].to_csv(index=False),
+                        f"{CUADRANTES_DIR}/{r['anio']}_{r['mes']:02d}.csv",
+                        GITHUB_TOKEN,
+                        f"Importar cuadrante {etiqueta}"
+                    )
+                    st.success(f"{etiqueta}: {r['trabajadores']} trabajadores, {r['filas']} filas")
+                except persistencia.ErrorGitHub as e:
+                    st.warning(f"{etiqueta}: importado, pero no se ha podido subir a GitHub: {e}")
 
-                else:
-                    html += "<tr class='resumen-blanco'>"
+                if r["desconocidos"]:
+                    st.warning(f"{etiqueta}: códigos desconocidos: {', '.join(r['desconocidos'])}")
 
-                # ---------- CELDAS ----------
-                for col_idx, valor in enumerate(fila):
+            if not resultados:
+                st.warning('El libro no tiene hojas "<Mes> <Año>"')
 
-                    if pd.isna(valor):
-                        valor = ""
+# ==================================================
+# DIAGNÓSTICO (SOLO ADMIN)
+# ==================================================
+diag.volcar(nip=st.session_state.nip, mes=mes_label)
 
-                    valor = str(valor)
+if st.session_state.is_admin:
+    with st.expander("🩺 Diagnóstico de rendimiento"):
+        st.caption(f"Tiempo total de esta ejecución: {diag.total_ms():.0f} ms")
+        st.dataframe(pd.DataFrame(diag.filas()), hide_index=True)
+
+        st.markdown("**Contadores**")
+        st.dataframe(
+            pd.DataFrame({"contador": list(diag.contadores), "valor": list(diag.contadores.values())}),
+            hide_index=True
+        )
 
-                    # Última columna = Total
-                    if col_idx == len(fila) - 1:
-                        html += (
-                            f"<td class='total'>{valor}</td>"
-                        )
-                    else:
-                        html += (
-                            f"<td>{valor}</td>"
-                        )
-
-                html += "</tr>"
-
-            # ============================================
-            # CIERRE
-            # ============================================
-            html += """
-            </table>
-            </div>
-            """
-
-            st.markdown(
-                html,
-                unsafe_allow_html=True
+        estadisticas = persistencia.cliente.estadisticas()
+        if estadisticas:
+            st.markdown("**Peticiones a GitHub (desde el arranque)**")
+            st.dataframe(
+                pd.DataFrame.from_dict(estadisticas, orient="index").round(1),
             )
-
-        except Exception as e:
-            st.error(f"Error leyendo el resumen: {e}")
@@ -0,0 +1,318 @@
+"""
+Banco de pruebas de rendimiento con datos sintéticos.
+
+Genera N trabajadores × M meses de cuadrantes (cuadrantes/AAAA_MM.csv) y
+un historial_cambios.csv de K cambios con el mismo formato que los reales,
+y mide cada etapa de la app: carga, aplicación del historial, pivot del
+cuadrante general, HTML, conteos por franja, compañeros y resumen anual,
+además de la memoria que ocupa el cuadrante cargado.
+
+El resultado es un JSON (mediana, mínimo y media en ms por etapa, más el
+commit y los parámetros) que se puede comparar entre commits:
+
+    python benchmark.py --trabajadores 200 --meses 36 --cambios 50000 -o bench.json
+    python benchmark.py ... -o nuevo.json --comparar bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import datos
+import resumen
+import vistas
+from turnos import cobertura_diaria, registro
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+NOMBRES = ["Ana", "Iago", "Javier", "Lucía", "Brais", "Uxía", "Xosé", "María", "Pablo", "Sara"]
+APELLIDOS = ["García", "Fernández", "López", "Seijo", "Vidal", "Fariña", "Castro", "Rey", "Pazos", "Otero"]
+CATEGORIAS = ["Agente", "Agente", "Agente", "Oficial", "Inspector"]
+
+# Código -> peso en el cuadrante sintético (parecido a los meses reales)
+CODIGOS = {
+    "D": 35, "1": 11, "2": 10, "3": 11, "L": 7, "Vac": 9, "BAJA": 6,
+    "Ts": 1, "AP": 1, "Dcc": 1, "perm": 1, "AGASP": 0.5, "EV": 0.3, "Tir": 0.3,
+    "2y3": 0.3, "1|2ex": 0.2, "3ex": 0.2, "JuB": 0.1, "1yJuB": 0.1, "curso": 0.3,
+}
+
+# ==================================================
+# GENERADOR
+# ==================================================
+def generar(directorio, trabajadores=200, meses=36, cambios=50000, desde=(2024, 1), semilla=0):
+    """
+    Escribe <directorio>/cuadrantes/AAAA_MM.csv y
+    <directorio>/historial_cambios.csv. Devuelve (ruta cuadrantes, ruta historial).
+    """
+    rng = np.random.default_rng(semilla)
+
+    carpeta = os.path.join(directorio, "cuadrantes")
+    os.makedirs(carpeta, exist_ok=True)
+
+    nips = np.array([f"{32000 + i:06d}" for i in range(trabajadores)])
+    nombres = np.array([
+        f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        for _ in range(trabajadores)
+    ])
+    categorias = rng.choice(CATEGORIAS, size=trabajadores)
+
+    codigos = np.array(list(CODIGOS))
+    pesos = np.array(list(CODIGOS.values()), dtype=float)
+    pesos /= pesos.sum()
+
+    anio, mes = desde
+    fechas_todas = []
+
+    for _ in range(meses):
+        fechas = pd.date_range(date(anio, mes, 1), periods=pd.Period(f"{anio}-{mes:02d}").days_in_month)
+        fechas_todas.append(fechas)
+
+        n = trabajadores * len(fechas)
+        df = pd.DataFrame({
+            "Año": anio,
+            "Mes": mes,
+            "Fecha": np.tile(fechas.strftime("%Y-%m-%d"), trabajadores),
+            "Día": np.tile([DIAS_SEMANA[d] for d in fechas.dayofweek], trabajadores),
+            "NIP": np.repeat(nips, len(fechas)),
+            "Nombre y Apellidos": np.repeat(nombres, len(fechas)),
+            "Categoría": np.repeat(categorias, len(fechas)),
+            "Turno": rng.choice(codigos, size=n, p=pesos),
+            "Tipo": "",
+        })
+        df.to_csv(os.path.join(carpeta, f"{anio}_{mes:02d}.csv"), index=False)
+
+        mes += 1
+        if mes > 12:
+            anio, mes = anio + 1, 1
+
+    # ---------- HISTORIAL ----------
+    todas = pd.DatetimeIndex(np.concatenate([f.to_numpy() for f in fechas_todas]))
+    quien = rng.integers(0, trabajadores, size=cambios)
+    nip_afectado = nips[quien].astype(object)
+
+    # ~1 % de cambios sobre NIP que no están en el cuadrante (se insertan)
+    externos = rng.random(cambios) < 0.01
+    nip_afectado[externos] = [f"A{n}" for n in nip_afectado[externos]]
+
+    inicio = datetime(desde[0], desde[1], 1)
+    segundos = np.sort(rng.integers(0, max(1, (todas[-1] - todas[0]).days) * 86400, size=cambios))
+
+    hist = pd.DataFrame({
+        "fecha_hora": (pd.Timestamp(inicio) + pd.to_timedelta(segundos, unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+        "usuario_admin": "ADMIN",
+        "nip_afectado": nip_afectado,
+        "nombre_afectado": nombres[quien],
+        "fecha_turno": todas[rng.integers(0, len(todas), size=cambios)].strftime("%Y-%m-%d"),
+        "turno_anterior": "",
+        "turno_nuevo": rng.choice(codigos, size=cambios, p=pesos),
+        "observaciones": "",
+    })
+    ruta_hist = os.path.join(directorio, "historial_cambios.csv")
+    hist.to_csv(ruta_hist, index=False)
+
+    return carpeta, ruta_hist
+
+# ==================================================
+# MEDICIÓN
+# ==================================================
+def _medir(fn, repeticiones, preparar=None):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        t0 = time.perf_counter()
+        resultado = fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return resultado, {
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "min_ms": round(min(tiempos), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3),
+        "repeticiones": repeticiones,
+    }
+
+def _vaciar_caches(carpeta=None):
+    datos._cache_meses.clear()
+    datos._cache_total.clear()
+    datos._snapshots.clear()
+    datos._indices.clear()
+    vistas._cache_cuadrantes.clear()
+    resumen._cache_resumenes.clear()
+    if carpeta:
+        shutil.rmtree(os.path.join(carpeta, datos.CACHE_DIR_NOMBRE), ignore_errors=True)
+
+def ejecutar(carpeta, ruta_hist, repeticiones=5):
+    """Mide cada etapa sobre los datos de `carpeta`. Devuelve {etapa: tiempos}."""
+    etapas = {}
+
+    def medir(nombre, fn, reps=repeticiones, preparar=None):
+        resultado, etapas[nombre] = _medir(fn, reps, preparar)
+        print(f"  {nombre:<28} {etapas[nombre]['mediana_ms']:>10.2f} ms", file=sys.stderr)
+        return resultado
+
+    # ---------- CARGA ----------
+    medir("cargar_cuadrantes_csv", lambda: datos.cargar_cuadrantes(carpeta),
+          reps=max(1, repeticiones // 2), preparar=lambda: _vaciar_caches(carpeta))
+    medir("cargar_cuadrantes_parquet", lambda: datos.cargar_cuadrantes(carpeta),
+          preparar=_vaciar_caches)
+    df = medir("cargar_cuadrantes_memoria", lambda: datos.cargar_cuadrantes(carpeta))
+
+    df_hist = medir("leer_historial", lambda: pd.read_csv(
+        ruta_hist, parse_dates=["fecha_turno", "fecha_hora"], dtype={"nip_afectado": str}
+    ))
+
+    # ---------- HISTORIAL ----------
+    df_aplicado = medir("aplicar_historial", lambda: datos.aplicar_historial(df.copy(), df_hist))
+
+    anio, mes = int(df["anio"].iloc[-1]), int(df["mes"].iloc[-1])
+    ruta_mes = os.path.join(carpeta, f"{anio}_{mes:02d}.csv")
+    hist_mes = df_hist[(df_hist["fecha_turno"].dt.year == anio) & (df_hist["fecha_turno"].dt.month == mes)]
+
+    medir("cuadrante_aplicado_mes", lambda: datos.cuadrante_aplicado(hist_mes, ruta_mes),
+          preparar=datos._snapshots.clear)
+
+    df_mes = df_aplicado[(df_aplicado["anio"] == anio) & (df_aplicado["mes"] == mes)]
+
+    # ---------- CUADRANTE GENERAL ----------
+    tabla = medir("pivot", lambda: vistas.tabla_cuadrante(df_mes, False))
+    medir("pivot_movil", lambda: vistas.tabla_cuadrante(df_mes, True))
+    html = medir("html_cuadrante", lambda: vistas.html_cuadrante(tabla, anio, mes, False, datos.es_festivo))
+    medir("cobertura_diaria", lambda: cobertura_diaria(tabla))
+
+    # ---------- MIS TURNOS ----------
+    indice = medir("indice_compañeros", lambda: datos.indice_compañeros(df_mes))
+    nips = df_mes["nip"].unique()
+    por_nip = [(nip, u) for nip, u in df_mes.drop_duplicates(["nip", "fecha"]).groupby("nip", sort=False, observed=True)]
+
+    def todos_los_calendarios():
+        # Todas las celdas de "Mis turnos" de todos los trabajadores
+        for nip, u in por_nip:
+            for fecha, turno in zip(u["fecha"], u["turno"]):
+                for p in registro.partes(str(turno)):
+                    datos.compañeros(indice, fecha, p, nip)
+
+    medir("compañeros_todos", todos_los_calendarios)
+
+    u = df_mes[df_mes["nip"] == nips[0]].drop_duplicates("fecha")
+    turnos_dia = dict(zip(u["fecha"].dt.date, u["turno"]))
+    medir("html_calendario", lambda: vistas.html_calendario(anio, mes, turnos_dia, indice, nips[0]))
+
+    # ---------- RESUMEN ----------
+    df_anio = df_aplicado[df_aplicado["anio"] == anio]
+    medir("calcular_resumen", lambda: resumen.calcular_resumen(df_anio))
+
+    return etapas, {
+        "filas_cuadrante": len(df),
+        "filas_mes": len(df_mes),
+        "bytes_html_cuadrante": len(html.encode("utf-8")),
+        "bytes_cuadrante": _bytes(df),
+    }
+
+def _bytes(df):
+    """Memoria de un DataFrame, contando el texto de cada celda."""
+    return int(df.memory_usage(deep=True).sum())
+
+# ==================================================
+# INFORME
+# ==================================================
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar(actual, anterior):
+    """Texto con la mediana de cada etapa frente a un informe anterior."""
+    lineas = [f"{anterior.get('commit')} -> {actual.get('commit')}"]
+    if anterior.get("parametros") != actual.get("parametros"):
+        lineas.append(f"⚠️ parámetros distintos: {anterior.get('parametros')} / {actual.get('parametros')}")
+    lineas.append(f"{'etapa':<28} {'antes ms':>10} {'ahora ms':>10} {'×':>7}")
+    for etapa, t in actual["etapas"].items():
+        previo = anterior.get("etapas", {}).get(etapa)
+        if previo is None:
+            lineas.append(f"{etapa:<28} {'-':>10} {t['mediana_ms']:>10.2f} {'':>7}")
+            continue
+        ratio = previo["mediana_ms"] / t["mediana_ms"] if t["mediana_ms"] else float("inf")
+        lineas.append(f"{etapa:<28} {previo['mediana_ms']:>10.2f} {t['mediana_ms']:>10.2f} {ratio:>6.2f}×")
+
+    lineas.append(f"{'tamaño':<28} {'antes':>10} {'ahora':>10} {'×':>7}")
+    for nombre, n in actual.get("tamanos", {}).items():
+        previo = anterior.get("tamanos", {}).get(nombre)
+        if not previo or not n:
+            lineas.append(f"{nombre:<28} {previo if previo is not None else '-':>10} {n:>10} {'':>7}")
+            continue
+        lineas.append(f"{nombre:<28} {previo:>10} {n:>10} {previo / n:>6.2f}×")
+    return "\n".join(lineas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas con datos sintéticos.")
+    parser.add_argument("--trabajadores", type=int, default=200)
+    parser.add_argument("--meses", type=int, default=36)
+    parser.add_argument("--cambios", type=int, default=50000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--directorio", help="donde generar los datos (por defecto, uno temporal)")
+    parser.add_argument("-o", "--salida", default="bench.json")
+    parser.add_argument("--comparar", help="informe JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    # No se generan datos sintéticos encima de unos cuadrantes existentes
+    if args.directorio:
+        existente = os.path.join(args.directorio, "cuadrantes")
+        if os.path.isdir(existente) and os.listdir(existente):
+            parser.error(f"{existente} ya existe y no está vacío")
+
+    directorio = args.directorio or tempfile.mkdtemp(prefix="cuadrante-bench-")
+    try:
+        print(f"Generando {args.trabajadores} trabajadores × {args.meses} meses, {args.cambios} cambios…", file=sys.stderr)
+        t0 = time.perf_counter()
+        carpeta, ruta_hist = generar(
+            directorio, args.trabajadores, args.meses, args.cambios, semilla=args.semilla
+        )
+        print(f"  generados en {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+        etapas, tamanos = ejecutar(carpeta, ruta_hist, args.repeticiones)
+    finally:
+        if not args.directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    informe = {
+        "commit": _commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "parametros": {
+            "trabajadores": args.trabajadores,
+            "meses": args.meses,
+            "cambios": args.cambios,
+            "repeticiones": args.repeticiones,
+            "semilla": args.semilla,
+        },
+        "tamanos": tamanos,
+        "etapas": etapas,
+    }
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"Informe en {args.salida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            print(comparar(informe, json.load(f)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Calendarios personales "Mis turnos" en PDF (reportlab).
+
+Los datos de cada calendario (turno de cada día y compañeros por franja)
+salen del mismo índice del mes que usa la app (datos.indice_compañeros),
+que se construye una vez por versión del historial. Con eso se preparan
+tuplas simples por trabajador. Desde la app se dibujan en un hilo en
+segundo plano y la página no se bloquea; desde la línea de comandos el
+dibujo se reparte en lotes entre procesos.
+
+Uso (un PDF por trabajador en calendarios_pdf/AAAA_MM/, o uno solo):
+
+    GITHUB_TOKEN=... python calendarios.py 2026 1 [--combinado] [-o carpeta]
+"""
+import argparse
+import calendar
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+from datos import es_festivo, compañeros, cuadrante_aplicado, indice_compañeros, version_mes
+from resumen import MESES_RESUMEN
+from turnos import registro
+
+CALENDARIOS_DIR = "calendarios_pdf"
+
+MIME_PDF = "application/pdf"
+MIME_ZIP = "application/zip"
+
+# Procesos del pool (sólo línea de comandos) y trabajadores por tarea
+# (menos tareas, menos pickling)
+MAX_PROCESOS = min(4, os.cpu_count() or 1)
+TRABAJADORES_POR_TAREA = 16
+
+# Trabajos lanzados desde la app que se recuerdan a la vez
+MAX_TRABAJOS = 4
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+# ==================================================
+# DATOS (PROCESO PRINCIPAL)
+# ==================================================
+def datos_calendarios(df_mes, indice, nips=None):
+    """
+    [(nip, nombre, dias)] de los trabajadores del mes (o sólo `nips`), en
+    el orden del cuadrante. `dias` es {día: [(nombre del turno, fondo,
+    texto, [compañeros])]} con una entrada por parte del turno, igual que
+    el calendario de la app.
+    """
+    filas = df_mes.drop_duplicates(["nip", "fecha"])
+    if nips is not None:
+        filas = filas[filas["nip"].isin(nips)]
+
+    # Cada parte de cada código se resuelve una sola vez
+    partes_de = {}
+    def partes(turno):
+        resultado = partes_de.get(turno)
+        if resultado is None:
+            resultado = partes_de[turno] = [
+                (p, registro.nombre(p), registro.estilo(p)["bg"], registro.estilo(p)["fg"])
+                for p in registro.partes(str(turno))
+            ]
+        return resultado
+
+    calendarios = OrderedDict()
+    for nip, nombre, fecha, turno in zip(filas["nip"], filas["nombre"], filas["fecha"], filas["turno"]):
+        _, _, dias = calendarios.setdefault(nip, (nip, nombre, {}))
+        if pd.isna(turno):
+            continue
+        dias[fecha.day] = [
+            (nombre_parte, bg, fg, compañeros(indice, fecha, p, nip))
+            for p, nombre_parte, bg, fg in partes(turno)
+        ]
+
+    return list(calendarios.values())
+
+def dias_festivos(anio, mes):
+    """Días del mes que se marcan en rojo (domingos y festivos)."""
+    return frozenset(
+        d.day for d in calendar.Calendar().itermonthdates(anio, mes)
+        if d.month == mes and (d.weekday() == 6 or es_festivo(d))
+    )
+
+# ==================================================
+# DIBUJO
+# ==================================================
+ANCHO, ALTO = landscape(A4)
+MARGEN = 28
+ALTO_TITULO = 34
+ALTO_CABECERA = 16
+
+FUENTE = "Helvetica"
+FUENTE_NEGRITA = "Helvetica-Bold"
+TAM_DIA = 10
+TAM_TURNO = 8
+TAM_COMPAÑEROS = 6.5
+INTERLINEA = 7.5
+
+# Los mismos pocos colores se repiten en todas las celdas
+_color = lru_cache(maxsize=None)(HexColor)
+
+def _pagina(c, anio, mes, festivos, nip, nombre, dias):
+    semanas = calendar.Calendar().monthdayscalendar(anio, mes)
+    ancho_celda = (ANCHO - 2 * MARGEN) / 7
+    alto_celda = (ALTO - 2 * MARGEN - ALTO_TITULO - ALTO_CABECERA) / len(semanas)
+
+    # ---------- TÍTULO ----------
+    c.setFont(FUENTE_NEGRITA, 16)
+    c.setFillColor(_color("#000000"))
+    c.drawString(MARGEN, ALTO - MARGEN - 18, f"{nombre} ({nip})")
+    c.setFont(FUENTE, 12)
+    c.drawRightString(ANCHO - MARGEN, ALTO - MARGEN - 18, f"{MESES_RESUMEN[mes - 1]} {anio}")
+
+    # ---------- DÍAS DE LA SEMANA ----------
+    y = ALTO - MARGEN - ALTO_TITULO
+    c.setFont(FUENTE_NEGRITA, 9)
+    for i, nombre_dia in enumerate(DIAS_SEMANA):
+        c.drawCentredString(MARGEN + (i + 0.5) * ancho_celda, y - 11, nombre_dia)
+    y -= ALTO_CABECERA
+
+    # ---------- CELDAS ----------
+    c.setStrokeColor(_color("#999999"))
+    for semana in semanas:
+        for i, dia in enumerate(semana):
+            if dia == 0:
+                continue
+
+            x = MARGEN + i * ancho_celda
+            c.rect(x, y - alto_celda, ancho_celda, alto_celda, stroke=1, fill=0)
+
+            c.setFont(FUENTE_NEGRITA, TAM_DIA)
+            c.setFillColor(_color("#FF0000" if dia in festivos else "#000000"))
+            c.drawString(x + 3, y - TAM_DIA - 1, str(dia))
+
+            _celda(c, x + 2, y - TAM_DIA - 4, ancho_celda - 4, y - alto_celda + 2, dias.get(dia, ()))
+        y -= alto_celda
+
+def _celda(c, x, y, ancho, y_min, partes):
+    """Partes del turno del día: nombre sobre su color y compañeros debajo."""
+    for nombre_parte, bg, fg, nombres in partes:
+        lineas = simpleSplit(", ".join(nombres), FUENTE, TAM_COMPAÑEROS, ancho - 4) if nombres else []
+
+        # Si no caben todos, la última línea indica cuántos son
+        caben = max(int((y - TAM_TURNO - 3 - y_min) // INTERLINEA), 0)
+        if len(lineas) > caben:
+            lineas = (lineas[:caben - 1] + [f"… ({len(nombres)} en total)"]) if caben else []
+
+        alto = TAM_TURNO + 3 + len(lineas) * INTERLINEA + 2
+        if y - alto < y_min:
+            alto = max(y - y_min, 0)
+        if alto <= 0:
+            return
+
+        c.setFillColor(_color(bg))
+        c.rect(x, y - alto, ancho, alto, stroke=0, fill=1)
+
+        c.setFillColor(_color(fg))
+        c.setFont(FUENTE_NEGRITA, TAM_TURNO)
+        c.drawCentredString(x + ancho / 2, y - TAM_TURNO, nombre_parte)
+
+        c.setFont(FUENTE, TAM_COMPAÑEROS)
+        for n, linea in enumerate(lineas):
+            c.drawCentredString(x + ancho / 2, y - TAM_TURNO - 3 - (n + 1) * INTERLINEA + 1, linea)
+
+        y -= alto + 2
+
+def _pdf(anio, mes, festivos, calendarios):
+    """Un PDF con una página por calendario."""
+    salida = io.BytesIO()
+    c = canvas.Canvas(salida, pagesize=(ANCHO, ALTO))
+    c.setTitle(f"Mis turnos - {MESES_RESUMEN[mes - 1]} {anio}")
+    for nip, nombre, dias in calendarios:
+        _pagina(c, anio, mes, festivos, nip, nombre, dias)
+        c.showPage()
+    c.save()
+    return salida.getvalue()
+
+def _pdfs_individuales(anio, mes, festivos, calendarios):
+    return [(nip, _pdf(anio, mes, festivos, [(nip, nombre, dias)])) for nip, nombre, dias in calendarios]
+
+# ==================================================
+# REPARTO
+# ==================================================
+_lock = threading.Lock()
+
+def _lotes(calendarios, tamano=TRABAJADORES_POR_TAREA):
+    return [calendarios[i:i + tamano] for i in range(0, len(calendarios), tamano)]
+
+def pdfs_individuales(anio, mes, calendarios, pool=None):
+    """
+    {nip: PDF} con un PDF por trabajador. Con `pool` (un
+    ProcessPoolExecutor) los lotes se dibujan en paralelo; si no, en el
+    hilo que llama.
+    """
+    festivos = dias_festivos(anio, mes)
+    if pool is None:
+        return dict(_pdfs_individuales(anio, mes, festivos, calendarios))
+    futuros = [pool.submit(_pdfs_individuales, anio, mes, festivos, lote) for lote in _lotes(calendarios)]
+    return {nip: pdf for f in futuros for nip, pdf in f.result()}
+
+def pdf_combinado(anio, mes, calendarios):
+    """Un único PDF con una página por trabajador (un canvas no se puede repartir)."""
+    return _pdf(anio, mes, dias_festivos(anio, mes), calendarios)
+
+def comprimir(pdfs, anio, mes):
+    """ZIP con un <nip>.pdf por trabajador."""
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as z:
+        for nip, pdf in pdfs.items():
+            z.writestr(f"{anio}_{mes:02d}/{nip}.pdf", pdf)
+    return salida.getvalue()
+
+def nombre_fichero(anio, mes, combinado):
+    return f"Mis turnos {MESES_RESUMEN[mes - 1]} {anio}.{'pdf' if combinado else 'zip'}"
+
+# ==================================================
+# TRABAJOS EN SEGUNDO PLANO (APP)
+# ==================================================
+# Sin procesos: hacer fork desde el servidor de Streamlit, que tiene muchos
+# hilos, puede dejar al hijo bloqueado en un lock copiado a medias, y con
+# spawn cada hijo volvería a ejecutar app.py, registrado como __main__.
+# Dibujar ~100 PDFs pequeños en un hilo tarda pocos segundos.
+_hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calendarios-pdf")
+_trabajos = OrderedDict()   # (anio, mes, version, combinado) -> Future, LRU
+
+def _generar(anio, mes, calendarios, combinado):
+    if combinado:
+        return pdf_combinado(anio, mes, calendarios)
+    return comprimir(pdfs_individuales(anio, mes, calendarios), anio, mes)
+
+def lanzar(anio, mes, df_mes, version, combinado):
+    """
+    Lanza (si no está ya hecho) la generación de los calendarios del mes.
+    El resultado es un PDF (combinado) o un ZIP con un PDF por
+    trabajador. Devuelve la clave para consultar el trabajo.
+    """
+    clave = (anio, mes, version, combinado)
+    with _lock:
+        trabajo = _trabajos.get(clave)
+        if trabajo is not None and not (trabajo.done() and trabajo.exception()):
+            _trabajos.move_to_end(clave)
+            return clave
+
+    calendarios = datos_calendarios(df_mes, indice_compañeros(df_mes, version))
+
+    with _lock:
+        _trabajos[clave] = _hilo.submit(_generar, anio, mes, calendarios, combinado)
+        while len(_trabajos) > MAX_TRABAJOS:
+            _trabajos.popitem(last=False)
+    return clave
+
+def trabajo(clave):
+    """Future del trabajo o None si no se ha lanzado (o ya se ha olvidado)."""
+    with _lock:
+        return _trabajos.get(clave)
+
+def main():
+    import persistencia
+
+    parser = argparse.ArgumentParser(description="Genera los calendarios 'Mis turnos' de un mes en PDF.")
+    parser.add_argument("anio", type=int)
+    parser.add_argument("mes", type=int)
+    parser.add_argument("--combinado", action="store_true", help="un único PDF con una página por trabajador")
+    parser.add_argument("-o", "--salida", default=CALENDARIOS_DIR)
+    args = parser.parse_args()
+
+    ruta = os.path.join("cuadrantes", f"{args.anio}_{args.mes:02d}.csv")
+    df_hist = persistencia.cargar_historial_mes(args.anio, args.mes, os.environ["GITHUB_TOKEN"])
+    df, _ = cuadrante_aplicado(df_hist, ruta)
+    df_mes = df[(df["anio"] == args.anio) & (df["mes"] == args.mes)]
+
+    calendarios = datos_calendarios(df_mes, indice_compañeros(df_mes, version_mes(df_hist, ruta)))
+
+    os.makedirs(args.salida, exist_ok=True)
+    if args.combinado:
+        destino = os.path.join(args.salida, nombre_fichero(args.anio, args.mes, True))
+        with open(destino, "wb") as f:
+            f.write(pdf_combinado(args.anio, args.mes, calendarios))
+        print(f"{len(calendarios)} calendarios en {destino}")
+        return
+
+    carpeta = os.path.join(args.salida, f"{args.anio}_{args.mes:02d}")
+    os.makedirs(carpeta, exist_ok=True)
+    # Aquí __main__ es este módulo, así que spawn es seguro
+    with ProcessPoolExecutor(MAX_PROCESOS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pdfs = pdfs_individuales(args.anio, args.mes, calendarios, pool)
+    for nip, pdf in pdfs.items():
+        with open(os.path.join(carpeta, f"{nip}.pdf"), "wb") as f:
+            f.write(pdf)
+    print(f"{len(calendarios)} calendarios en {carpeta}/")
+
+if __name__ == "__main__":
+    main()
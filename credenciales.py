@@ -0,0 +1,91 @@
+"""
+Índice de credenciales para el login.
+
+usuarios.csv se lee una sola vez por proceso y se vuelve a leer sólo si
+cambia (mtime, tamaño). En memoria no se guardan los DNI en claro sino un
+HMAC-SHA256 con una clave aleatoria del proceso, y la comparación se hace
+en tiempo constante (hmac.compare_digest), también para el usuario ADMIN y
+para los NIP que no existen.
+"""
+import csv
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+
+from datos import normalizar_nip
+
+class IndiceCredenciales:
+
+    def __init__(self):
+        self._clave = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self.ruta = None
+        self._admin = None          # (usuario, hash de la contraseña)
+        self._version = None        # (mtime, tamaño) de usuarios.csv
+        self._usuarios = {}         # nip -> {"nombre", "hash"}
+        self._nulo = self._hash("")
+
+    def _hash(self, secreto):
+        return hmac.new(self._clave, str(secreto).encode("utf-8"), hashlib.sha256).digest()
+
+    def configurar(self, ruta, admin_user, admin_pass):
+        """Fija el fichero de usuarios y el usuario administrador (idempotente)."""
+        with self._lock:
+            if self.ruta != ruta:
+                self.ruta = ruta
+                self._version = None
+            self._admin = (admin_user, self._hash(admin_pass))
+
+    # ---------- CARGA ----------
+    def _recargar_si_cambia(self):
+        try:
+            st = os.stat(self.ruta)
+            version = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            version = None
+
+        if version == self._version:
+            return
+
+        usuarios = {}
+        if version is not None:
+            with open(self.ruta, encoding="utf-8-sig", newline="") as f:
+                for fila in csv.DictReader(f):
+                    nip = normalizar_nip(fila["nip"])
+                    # Como antes: si un NIP se repite, vale la primera fila
+                    usuarios.setdefault(nip, {
+                        "nombre": fila.get("nombre", ""),
+                        "hash": self._hash(fila["dni"]),
+                    })
+
+        with self._lock:
+            self._usuarios = usuarios
+            self._version = version
+
+    # ---------- CONSULTA ----------
+    def comprobar(self, usuario, password):
+        """
+        Devuelve (nip, es_admin) si las credenciales son válidas o None.
+        """
+        intento = self._hash(password)
+
+        admin_user, admin_hash = self._admin
+        if usuario == admin_user:
+            if hmac.compare_digest(intento, admin_hash):
+                return admin_user, True
+
+        self._recargar_si_cambia()
+
+        nip = normalizar_nip(usuario)
+        registro = self._usuarios.get(nip)
+
+        # Con NIP inexistente se compara igualmente, contra un hash nulo
+        esperado = registro["hash"] if registro else self._nulo
+        if hmac.compare_digest(intento, esperado) and registro is not None:
+            return nip, False
+
+        return None
+
+indice = IndiceCredenciales()
@@ -0,0 +1,518 @@
+"""
+Carga de los cuadrantes mensuales (cuadrantes/AAAA_MM.csv).
+
+Cada CSV se convierte una sola vez a formato columnar (Parquet) y se
+guarda también en memoria. La clave de la caché es (mtime, tamaño) del CSV,
+así que un rerun de Streamlit sólo hace un os.stat() por mes y vuelve a
+parsear únicamente los meses cuyo CSV ha cambiado.
+
+La aplicación trabaja mes a mes: sólo se carga el mes seleccionado (y se
+precargan sus vecinos en segundo plano). En memoria se guardan como mucho
+MAX_MESES_EN_MEMORIA meses; el resto se relee del Parquet si hace falta.
+
+En memoria (y en el Parquet) cada mes usa un esquema compacto: sin las
+columnas duplicadas del CSV (NIP, Fecha, Mes, Año), el texto como
+categorías y año, mes y día como enteros pequeños.
+"""
+import glob
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from turnos import registro
+
+try:
+    import pyarrow  # noqa: F401
+    HAY_PARQUET = True
+except ImportError:
+    HAY_PARQUET = False
+
+CUADRANTES_DIR = "cuadrantes"
+CACHE_DIR_NOMBRE = ".cache"
+
+# Meses que se guardan en memoria a la vez (el resto sigue en Parquet)
+MAX_MESES_EN_MEMORIA = 6
+
+# Tipos de las columnas del cuadrante en memoria (ver compactar)
+ESQUEMA = {
+    "anio": "int16",
+    "mes": "int8",
+    "dia": "int8",
+    "nip": "category",
+    "nombre": "category",
+    "categoria": "category",
+    "turno": "category",
+    "Día": "category",
+    "Tipo": "category",
+}
+
+# Cambia con el formato del Parquet, para no leer cachés antiguas
+VERSION_ESQUEMA = 2
+
+# ==================================================
+# FESTIVOS
+# ==================================================
+FESTIVOS = {date(2026, 1, 1), date(2026, 1, 6), date(2026, 2, 17), date(2026, 3, 19), date(2026, 4, 2), date(2026, 4, 3), date(2026, 5, 1), date(2026, 5, 22), date(2026, 7, 25), date(2026, 8, 15), date(2026, 10, 12), date(2026, 12, 8), date(2026, 12, 25)}
+
+def es_festivo(fecha):
+    return fecha in FESTIVOS
+
+# ==================================================
+# FUNCIONES BASE
+# ==================================================
+def normalizar_nip(nip):
+    return str(nip).strip().zfill(6)
+
+def compactar(df):
+    """
+    Esquema compacto del cuadrante en memoria: año, mes y día como
+    enteros pequeños y el texto (muy repetido) como categorías.
+    """
+    tipos = {c: t for c, t in ESQUEMA.items() if c in df.columns and df[c].dtype != t}
+    # assign y no astype(dict): éste copia el DataFrame entero
+    return df.assign(**{c: df[c].astype(t) for c, t in tipos.items()}) if tipos else df
+
+def _leer_csv_mes(ruta):
+    df_tmp = pd.read_csv(
+        ruta,
+        parse_dates=["Fecha"],
+        dtype={"Día": str, "Tipo": str}
+    )
+
+    df_tmp = pd.DataFrame({
+        "anio": df_tmp["Año"],
+        "mes": df_tmp["Mes"],
+        "fecha": df_tmp["Fecha"],
+        "dia": df_tmp["Fecha"].dt.day,
+        "nip": df_tmp["NIP"].apply(normalizar_nip),
+        "nombre": df_tmp["Nombre y Apellidos"],
+        "categoria": df_tmp["Categoría"],
+        "turno": df_tmp["Turno"],
+        "Día": df_tmp.get("Día"),
+        "Tipo": df_tmp.get("Tipo"),
+    })
+
+    return compactar(df_tmp)
+
+# ==================================================
+# CACHÉ COLUMNAR (DISCO + MEMORIA)
+# ==================================================
+_cache_meses = OrderedDict()   # ruta CSV -> (clave, DataFrame), LRU
+_cache_total = {}      # directorio -> (claves, DataFrame concatenado)
+_lock = threading.Lock()
+
+def _clave_archivo(ruta):
+    info = os.stat(ruta)
+    return (info.st_mtime_ns, info.st_size)
+
+def _ruta_parquet(ruta_csv, clave):
+    carpeta = os.path.join(os.path.dirname(ruta_csv), CACHE_DIR_NOMBRE)
+    nombre = os.path.splitext(os.path.basename(ruta_csv))[0]
+    return carpeta, nombre, os.path.join(carpeta, f"{nombre}-{clave[0]}-{clave[1]}-v{VERSION_ESQUEMA}.parquet")
+
+def _guardar_parquet(df_mes, carpeta, nombre, ruta_pq):
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        tmp = f"{ruta_pq}.tmp"
+        df_mes.to_parquet(tmp, index=False)
+        os.replace(tmp, ruta_pq)
+
+        # Borrar versiones antiguas del mismo mes
+        for viejo in glob.glob(os.path.join(carpeta, f"{nombre}-*.parquet")):
+            if viejo != ruta_pq:
+                os.remove(viejo)
+    except OSError:
+        # Sin permisos de escritura: nos quedamos sólo con la caché en memoria
+        pass
+
+def cargar_mes_csv(ruta):
+    """
+    Devuelve el cuadrante de un CSV mensual ya normalizado.
+    Sólo se parsea el CSV si ha cambiado desde la última vez.
+    """
+    clave = _clave_archivo(ruta)
+
+    en_memoria = _cache_meses.get(ruta)
+    if en_memoria and en_memoria[0] == clave:
+        with _lock:
+            if ruta in _cache_meses:
+                _cache_meses.move_to_end(ruta)
+        return en_memoria[1]
+
+    df_mes = None
+
+    if HAY_PARQUET:
+        carpeta, nombre, ruta_pq = _ruta_parquet(ruta, clave)
+        if os.path.exists(ruta_pq):
+            try:
+                # Una columna categórica sin valores vuelve como float
+                df_mes = compactar(pd.read_parquet(ruta_pq))
+            except Exception:
+                df_mes = None
+
+        if df_mes is None:
+            df_mes = _leer_csv_mes(ruta)
+            _guardar_parquet(df_mes, carpeta, nombre, ruta_pq)
+    else:
+        df_mes = _leer_csv_mes(ruta)
+
+    _recordar_mes(ruta, clave, df_mes)
+    return df_mes
+
+def _recordar_mes(ruta, clave, df_mes):
+    with _lock:
+        _cache_meses[ruta] = (clave, df_mes)
+        _cache_meses.move_to_end(ruta)
+        while len(_cache_meses) > MAX_MESES_EN_MEMORIA:
+            _cache_meses.popitem(last=False)
+
+def guardar_mes_csv(df_csv, ruta):
+    """
+    Escribe un cuadrante mensual (con las columnas del CSV) en `ruta` y
+    deja preparadas sus cachés (Parquet y memoria) a partir del mismo
+    texto, sin volver a leer el fichero. Devuelve el mes normalizado.
+    """
+    texto = df_csv.to_csv(index=False)
+
+    tmp = f"{ruta}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+    df_mes = _leer_csv_mes(io.StringIO(texto))
+    clave = _clave_archivo(ruta)
+
+    if HAY_PARQUET:
+        _guardar_parquet(df_mes, *_ruta_parquet(ruta, clave))
+
+    _recordar_mes(ruta, clave, df_mes)
+    return df_mes
+
+def version_cuadrantes(directorio=CUADRANTES_DIR):
+    archivos = sorted(glob.glob(os.path.join(directorio, "*.csv")))
+    return tuple((ruta, _clave_archivo(ruta)) for ruta in archivos)
+
+def cargar_cuadrantes(directorio=CUADRANTES_DIR):
+    """
+    Devuelve todos los cuadrantes concatenados.
+    El resultado es una copia: quien lo reciba puede modificarlo.
+    """
+    claves = version_cuadrantes(directorio)
+    if not claves:
+        return pd.DataFrame()
+
+    en_memoria = _cache_total.get(directorio)
+    if en_memoria and en_memoria[0] == claves:
+        return en_memoria[1].copy()
+
+    meses = [cargar_mes_csv(ruta) for ruta, _ in claves]
+    df = pd.DataFrame({c: _concatenar([m[c] for m in meses]) for c in meses[0].columns})
+
+    with _lock:
+        _cache_total[directorio] = (claves, df)
+
+    return df.copy()
+
+def _concatenar(columnas):
+    """
+    Una columna a partir de la de cada mes. pd.concat pasaría a texto las
+    categóricas cuyas categorías difieren entre meses.
+    """
+    if all(isinstance(c.dtype, pd.CategoricalDtype) for c in columnas):
+        try:
+            return union_categoricals(columnas, ignore_order=True)
+        except TypeError:
+            # Categorías de tipos distintos (p. ej. turnos numéricos y texto)
+            return pd.Categorical(np.concatenate([c.to_numpy(dtype=object) for c in columnas]))
+    return np.concatenate([c.to_numpy() for c in columnas])
+
+# ==================================================
+# HISTORIAL DE CAMBIOS
+# ==================================================
+def _ultimos_cambios(df_hist):
+    """
+    Reduce el historial a un cambio por (nip, fecha_turno): gana el último
+    según fecha_hora. Para las filas que haya que insertar se conserva el
+    nombre del primer registro, igual que hacía la aplicación fila a fila.
+    """
+    df_hist = df_hist.sort_values("fecha_hora", kind="stable")
+
+    if "nombre_afectado" in df_hist.columns:
+        nombres = df_hist["nombre_afectado"].to_numpy()
+    else:
+        nombres = [""] * len(df_hist)
+
+    cambios = pd.DataFrame({
+        "nip": df_hist["nip_afectado"].map(normalizar_nip).to_numpy(),
+        "fecha": pd.to_datetime(df_hist["fecha_turno"]).to_numpy(),
+        "turno": df_hist["turno_nuevo"].to_numpy(),
+        "nombre": nombres,
+    })
+
+    ultimos = cambios.drop_duplicates(["nip", "fecha"], keep="last")
+    primeros = cambios.drop_duplicates(["nip", "fecha"], keep="first")
+
+    return ultimos.set_index(["nip", "fecha"]), primeros.set_index(["nip", "fecha"])
+
+def aplicar_historial(df, df_hist):
+    """
+    Aplica el historial sobre el cuadrante (el último cambio gana).
+    Los turnos existentes se actualizan en una sola pasada y los que no
+    existen se insertan de golpe al final.
+    """
+    if df_hist.empty:
+        return df
+
+    ultimos, primeros = _ultimos_cambios(df_hist)
+
+    claves_df = pd.MultiIndex.from_arrays([df["nip"], df["fecha"]])
+    existe = claves_df.isin(ultimos.index)
+
+    if existe.any():
+        nuevos = ultimos["turno"].reindex(claves_df[existe]).to_numpy()
+        df["turno"] = _con_categorias(df["turno"], nuevos)
+        df.loc[existe, "turno"] = nuevos
+
+    # Se insertan en el orden del primer cambio de cada clave
+    faltan = ~primeros.index.isin(claves_df)
+    if not faltan.any():
+        return df
+
+    claves_nuevas = primeros.index[faltan]
+    fechas = claves_nuevas.get_level_values("fecha")
+
+    filas_nuevas = pd.DataFrame({
+        "anio": fechas.year,
+        "mes": fechas.month,
+        "fecha": fechas,
+        "dia": fechas.day,
+        "nip": claves_nuevas.get_level_values("nip"),
+        "nombre": primeros["nombre"].to_numpy()[faltan],
+        "categoria": "",
+        "turno": ultimos["turno"].reindex(claves_nuevas).to_numpy(),
+    })
+
+    for c in filas_nuevas.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = _con_categorias(df[c], filas_nuevas[c].to_numpy())
+            filas_nuevas[c] = pd.Categorical(filas_nuevas[c], categories=df[c].cat.categories)
+
+    return compactar(pd.concat([df, filas_nuevas], ignore_index=True))
+
+def _con_categorias(serie, valores):
+    """La columna categórica `serie`, admitiendo también `valores`."""
+    nuevas = pd.Index(pd.unique(valores)).dropna().difference(serie.cat.categories)
+    return serie.cat.add_categories(nuevas) if len(nuevas) else serie
+
+# ==================================================
+# CUADRANTE APLICADO (SNAPSHOT + MARCA DE AGUA)
+# ==================================================
+# Para cada mes (un CSV de cuadrantes/) se guarda el cuadrante con su
+# historial ya aplicado junto con:
+#   - la versión del CSV base,
+#   - la marca de agua (último fecha_hora aplicado),
+#   - una huella del historial aplicado hasta esa marca.
+# Si sólo han llegado registros posteriores a la marca, se aplican esos
+# sobre el snapshot. Si algún registro antiguo se ha editado o borrado
+# (pestaña Historial), la huella no coincide y se reconstruye desde cero.
+_snapshots = OrderedDict()   # ruta CSV -> snapshot, LRU
+
+def _huella(df_hist):
+    """
+    Huella del contenido del historial. No depende del orden de las
+    filas, así que puede actualizarse sumando la de los registros nuevos.
+    """
+    if df_hist.empty:
+        return 0
+    hashes = pd.util.hash_pandas_object(df_hist, index=False)
+    return int(hashes.to_numpy().sum())
+
+def cuadrante_aplicado(df_hist, ruta_csv):
+    """
+    Devuelve (df, version): el cuadrante del mes `ruta_csv` con su
+    historial aplicado y una clave que cambia cada vez que cambia el
+    resultado. El DataFrame es compartido entre sesiones: no se debe
+    modificar.
+    """
+    base = _clave_archivo(ruta_csv)
+    snap = _snapshots.get(ruta_csv)
+
+    if snap and snap["base"] == base:
+        if snap["hist"] is df_hist:
+            with _lock:
+                if ruta_csv in _snapshots:
+                    _snapshots.move_to_end(ruta_csv)
+            return snap["df"], snap["version"]
+
+        if snap["marca"] is None or df_hist.empty:
+            nuevos = df_hist
+            antiguos = df_hist.iloc[:0]
+        else:
+            es_nuevo = df_hist["fecha_hora"] > snap["marca"]
+            nuevos = df_hist[es_nuevo]
+            antiguos = df_hist[~es_nuevo]
+
+        if len(antiguos) == snap["n"] and _huella(antiguos) == snap["huella"]:
+            if nuevos.empty:
+                df = snap["df"]
+            else:
+                df = aplicar_historial(snap["df"].copy(), nuevos)
+
+            snap = _guardar_snapshot(
+                ruta_csv, base, df_hist, df,
+                snap["huella"] + _huella(nuevos)
+            )
+            return df, snap["version"]
+
+    df = aplicar_historial(cargar_mes_csv(ruta_csv).copy(), df_hist)
+    snap = _guardar_snapshot(ruta_csv, base, df_hist, df, _huella(df_hist))
+
+    return df, snap["version"]
+
+def version_mes(df_hist, ruta_csv):
+    """
+    La misma versión que devolvería cuadrante_aplicado(), pero sin aplicar
+    el historial (sirve para comprobar cachés que dependen de varios meses).
+    """
+    base = _clave_archivo(ruta_csv)
+    snap = _snapshots.get(ruta_csv)
+
+    if snap and snap["base"] == base and snap["hist"] is df_hist:
+        return snap["version"]
+
+    return (ruta_csv, base, _huella(df_hist) % (1 << 64))
+
+def _guardar_snapshot(ruta_csv, base, df_hist, df, huella):
+    marca = None if df_hist.empty else df_hist["fecha_hora"].max()
+    huella = huella % (1 << 64)
+
+    snap = {
+        "base": base,
+        "hist": df_hist,
+        "marca": marca,
+        "n": len(df_hist),
+        "huella": huella,
+        "df": df,
+        "version": (ruta_csv, base, huella),
+    }
+
+    with _lock:
+        _snapshots.pop(ruta_csv, None)
+        _snapshots[ruta_csv] = snap
+        while len(_snapshots) > MAX_MESES_EN_MEMORIA:
+            _snapshots.popitem(last=False)
+
+    return snap
+
+# ==================================================
+# ÍNDICE DE COMPAÑEROS (FECHA, FRANJA) -> TRABAJADORES
+# ==================================================
+_indices = OrderedDict()   # (version, anio, mes) -> índice, LRU
+
+def formatear_nombre(nombre):
+    partes = nombre.split()
+    if partes[0] in {"Iago", "Javier"} and len(partes) > 1:
+        return f"{partes[0]} {partes[1][0]}."
+    return partes[0]
+
+def indice_compañeros(df_mes, version=None):
+    """
+    Índice del mes (fecha, franja) -> [(posición, nip, nombre corto), ...]
+    en el orden del cuadrante. Se construye una vez por versión del
+    historial; con version=None (vista previa) no se guarda.
+    """
+    clave = (version, df_mes["anio"].iat[0], df_mes["mes"].iat[0]) if len(df_mes) else None
+
+    if version is not None and clave is not None:
+        with _lock:
+            indice = _indices.get(clave)
+            if indice is not None:
+                _indices.move_to_end(clave)
+                return indice
+
+    # Cada código y cada nombre distinto se procesa una sola vez
+    cod_turno, turnos = pd.factorize(df_mes["turno"])
+    cod_nombre, nombres = pd.factorize(df_mes["nombre"])
+    franjas = [registro.franjas(t) for t in turnos]
+    cortos = [formatear_nombre(str(n)) for n in nombres]
+
+    indice = {}
+    for pos, (fecha, nip, i_nombre, i_turno) in enumerate(zip(
+        df_mes["fecha"], df_mes["nip"], cod_nombre, cod_turno
+    )):
+        if i_turno < 0:
+            continue
+        for franja in franjas[i_turno]:
+            indice.setdefault((fecha, franja), []).append((pos, nip, cortos[i_nombre]))
+
+    if version is not None and clave is not None:
+        with _lock:
+            _indices[clave] = indice
+            while len(_indices) > MAX_MESES_EN_MEMORIA:
+                _indices.popitem(last=False)
+
+    return indice
+
+def compañeros(indice, fecha, turno, excluir_nip):
+    """
+    Nombres de quienes coinciden con `turno` en alguna franja ese día
+    (incluye extras), sin `excluir_nip` y en el orden del cuadrante.
+    """
+    franjas = registro.franjas(turno)
+
+    if len(franjas) == 1:
+        (franja,) = franjas
+        return [n for _, nip, n in indice.get((fecha, franja), ()) if nip != excluir_nip]
+
+    vistos = {}
+    for franja in franjas:
+        for pos, nip, n in indice.get((fecha, franja), ()):
+            if nip != excluir_nip:
+                vistos[pos] = n
+    return [vistos[pos] for pos in sorted(vistos)]
+
+# ==================================================
+# PRECARGA EN SEGUNDO PLANO
+# ==================================================
+PRECARGA_VALIDEZ_SEG = 60
+
+_precarga = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precarga")
+_precargando = set()
+_precargado_en = {}    # ruta CSV -> instante de la última precarga
+
+def _precargar_mes(anio, mes, ruta_csv, cargar_historial):
+    try:
+        cuadrante_aplicado(cargar_historial(anio, mes), ruta_csv)
+    except Exception:
+        # Es sólo una precarga: si falla, el mes se cargará al seleccionarlo
+        pass
+    finally:
+        with _lock:
+            _precargando.discard(ruta_csv)
+            _precargado_en[ruta_csv] = time.monotonic()
+
+def precargar_meses(meses, cargar_historial):
+    """
+    Deja preparados en segundo plano (CSV, historial y snapshot) los
+    meses indicados como (anio, mes, ruta_csv). `cargar_historial(anio, mes)`
+    devuelve el historial de ese mes. Un mes precargado hace menos de
+    PRECARGA_VALIDEZ_SEG segundos no se vuelve a pedir.
+    """
+    ahora = time.monotonic()
+
+    for anio, mes, ruta_csv in meses:
+        with _lock:
+            if ruta_csv in _precargando:
+                continue
+            if ahora - _precargado_en.get(ruta_csv, float("-inf")) < PRECARGA_VALIDEZ_SEG:
+                continue
+            _precargando.add(ruta_csv)
+        _precarga.submit(_precargar_mes, anio, mes, ruta_csv, cargar_historial)
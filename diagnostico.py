@@ -0,0 +1,92 @@
+"""
+Tiempos por etapa y contadores de cada ejecución del script.
+
+    diag = Diagnostico(activo=True)
+    with diag.tramo("historial"):
+        ...
+    diag.contar("bytes_html", len(html))
+
+Desactivado, tramo() devuelve siempre el mismo contexto vacío y contar()
+no hace nada, así que el coste es una llamada a función por etapa.
+Opcionalmente cada ejecución se añade como una línea JSON a un fichero
+para analizarlo después.
+"""
+import contextlib
+import json
+import threading
+import time
+from datetime import datetime
+
+_NULO = contextlib.nullcontext()
+_lock_log = threading.Lock()
+
+class Diagnostico:
+
+    def __init__(self, activo=False, ruta_log=None, previos=None):
+        self.ruta_log = ruta_log
+        self.activo = activo or bool(ruta_log)
+        self.tramos = []        # [(nombre, ms)] en orden de finalización
+        self.contadores = {}
+        self._inicio = time.perf_counter()
+
+        # Tramos de la ejecución que terminó en st.rerun() (p. ej. un guardado)
+        for nombre, ms in previos or ():
+            self.tramos.append((f"{nombre} (ejecución anterior)", ms))
+
+    # ---------- MEDICIÓN ----------
+    def tramo(self, nombre):
+        if not self.activo:
+            return _NULO
+        return self._tramo(nombre)
+
+    @contextlib.contextmanager
+    def _tramo(self, nombre):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tramos.append((nombre, (time.perf_counter() - t0) * 1000))
+
+    def contar(self, nombre, n=1):
+        if self.activo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def antes_de_rerun(self, estado):
+        """
+        Deja los tramos en `estado` (st.session_state) para que la
+        siguiente ejecución los muestre: st.rerun() corta esta.
+        """
+        if self.activo:
+            estado["diag_previo"] = list(self.tramos)
+
+    def total_ms(self):
+        return (time.perf_counter() - self._inicio) * 1000
+
+    # ---------- SALIDA ----------
+    def filas(self):
+        """[{"etapa", "ms"}] para mostrar en una tabla."""
+        return [{"etapa": nombre, "ms": round(ms, 2)} for nombre, ms in self.tramos]
+
+    def por_etapa(self):
+        """{etapa: ms}, sumando las etapas que se repiten."""
+        suma = {}
+        for nombre, ms in self.tramos:
+            suma[nombre] = round(suma.get(nombre, 0) + ms, 2)
+        return suma
+
+    def volcar(self, **extra):
+        """Añade la ejecución al fichero JSON-lines, si hay uno configurado."""
+        if not self.ruta_log:
+            return
+
+        linea = json.dumps({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "total_ms": round(self.total_ms(), 2),
+            "tramos": self.por_etapa(),
+            "contadores": self.contadores,
+            **extra,
+        }, ensure_ascii=False, default=str)
+
+        with _lock_log:
+            with open(self.ruta_log, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
@@ -0,0 +1,285 @@
+"""
+Exportación del cuadrante aplicado a Excel con el formato de
+"Plantilla de exportación.xlsx" (hoja "Hoja 1"): título, cabecera de dos
+filas con los días (domingos y festivos en verde), dos filas por
+trabajador y las filas de Mañanas / Tardes / Noches al final.
+
+Se escribe en streaming con xlsxwriter en modo constant_memory: cada fila
+se vuelca a disco en cuanto se pasa a la siguiente, así que la memoria no
+crece con el número de trabajadores ni de meses. Cada código de turno
+tiene un único objeto Format por libro (con los colores del registro de
+turnos), que se crea la primera vez que aparece.
+
+Uso (un libro con una hoja por mes del año, o sólo un mes):
+
+    GITHUB_TOKEN=... python exportar.py 2026 [--mes 1] [-o cuadrante_2026.xlsx]
+"""
+import argparse
+import io
+import os
+from datetime import date
+
+import pandas as pd
+import xlsxwriter
+
+from datos import es_festivo as es_festivo_por_defecto, cuadrante_aplicado
+from resumen import MESES_RESUMEN, meses_del_anio
+from turnos import registro, cobertura_diaria
+from vistas import tabla_cuadrante
+
+ESCUDO_FILE = "Placa.png"
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# ==================================================
+# PLANTILLA (HOJA 1 DE "Plantilla de exportación.xlsx")
+# ==================================================
+FILA_TITULO = 1            # fila 2 de Excel (la 1 es la del escudo)
+FILA_CABECERA = 2          # filas 3 y 4
+FILA_TRABAJADORES = 4      # desde la fila 5, dos filas por trabajador
+COL_DIAS = 3               # columna D
+
+ALTO_ESCUDO = 130.05
+ALTO_TITULO = 45
+ALTO_FILA = 27
+ALTO_CONTEO = 13.8
+
+ANCHO_COLUMNAS = {0: 60.78, 1: 20.78, 2: 14}
+ANCHO_DIA = 8.78
+
+VERDE_FESTIVO = "#92D050"
+AZUL_ALTERNO = "#CFE2F3"
+
+# Franja, título, horario, fondo, texto
+FILAS_CONTEO = (
+    ("1", "Mañanas", "7:00 - 14:30", "#CFE2F3", "#0000FF"),
+    ("2", "Tardes", "14:30 - 22:00", "#FCE5CD", "#FF9900"),
+    ("3", "Noches", "22:00 - 7:00", "#F4CCCC", "#FF0000"),
+)
+
+# ==================================================
+# FORMATOS (UNO POR CÓDIGO Y LIBRO)
+# ==================================================
+class _Formatos:
+
+    def __init__(self, libro):
+        self.libro = libro
+        self._por_clase = {}    # clase de estilo del registro -> Format
+        self._por_codigo = {}   # código -> (valor a escribir, Format)
+
+        base = {"font_name": "Arial", "align": "center", "valign": "vcenter", "border": 1}
+
+        self.titulo = libro.add_format({
+            **base, "font_name": "Comic Sans MS", "font_size": 30, "bold": True, "border": 2,
+        })
+        self.cabecera = libro.add_format({**base, "font_size": 20, "bold": True, "border": 2})
+        self.cabecera_dias = libro.add_format({**base, "font_size": 24, "bold": True, "border": 2})
+        self.dia = libro.add_format({**base, "font_size": 24, "bold": True, "bottom": 2})
+        self.dia_festivo = libro.add_format({
+            **base, "font_size": 24, "bold": True, "bottom": 2,
+            "bg_color": VERDE_FESTIVO, "font_color": "#FF0000",
+        })
+        self.trabajador = [
+            libro.add_format({**base, "font_size": 20, "top": 2, "bottom": 2}),
+            libro.add_format({**base, "font_size": 20, "top": 2, "bottom": 2, "bg_color": AZUL_ALTERNO}),
+        ]
+        # Segunda fila de cada trabajador (vacía, para anotaciones)
+        self.nota = libro.add_format({**base, "font_size": 24, "top": 0, "bottom": 2})
+
+        self.conteo = {}
+        for franja, _, _, bg, fg in FILAS_CONTEO:
+            etiqueta = libro.add_format({
+                **base, "font_size": 10, "bold": True, "bg_color": bg, "font_color": fg, "border": 2,
+            })
+            numero = libro.add_format({**base, "font_size": 10})
+            self.conteo[franja] = (etiqueta, numero)
+
+    def turno(self, codigo):
+        """(valor, formato) de un código; los códigos numéricos van como número."""
+        if pd.isna(codigo):
+            codigo = ""
+        en_cache = self._por_codigo.get(codigo)
+        if en_cache is not None:
+            return en_cache
+
+        turno = registro.info(codigo)
+
+        formato = self._por_clase.get(turno.clase)
+        if formato is None:
+            e = turno.estilo
+            formato = self._por_clase[turno.clase] = self.libro.add_format({
+                "font_name": "Arial", "font_size": 24, "align": "center", "valign": "vcenter",
+                "border": 1, "top": 2, "bottom": 0,
+                "bg_color": e["bg"], "font_color": e["fg"],
+                "bold": bool(e["bold"]), "italic": bool(e["italic"]),
+            })
+
+        valor = int(turno.codigo) if turno.codigo.isdigit() else turno.codigo
+        resultado = self._por_codigo[codigo] = (valor, formato)
+        return resultado
+
+# ==================================================
+# HOJA DE UN MES
+# ==================================================
+def _escribir_fila_trabajador(hoja, formatos, fila, datos, valores, fmt_trabajador):
+    """
+    Dos filas por trabajador, con nombre, categoría y NIP combinados en
+    vertical. En constant_memory una fila se vuelca al escribir en la
+    siguiente, así que primero se completa la fila de arriba y después se
+    registran las combinaciones (que rellenan la de abajo).
+    """
+    for col, texto in enumerate(datos):
+        hoja.write_string(fila, col, str(texto), fmt_trabajador)
+
+    for col, v in enumerate(valores, start=COL_DIAS):
+        valor, formato = formatos.turno(v)
+        if valor == "":
+            hoja.write_blank(fila, col, None, formato)
+        elif isinstance(valor, int):
+            hoja.write_number(fila, col, valor, formato)
+        else:
+            hoja.write_string(fila, col, valor, formato)
+
+    for col, texto in enumerate(datos):
+        hoja.merge_range(fila, col, fila + 1, col, str(texto), fmt_trabajador)
+
+    for col in range(COL_DIAS, COL_DIAS + len(valores)):
+        hoja.write_blank(fila + 1, col, None, formatos.nota)
+
+def _escribir_mes(libro, formatos, anio, mes, df_mes, es_festivo, escudo):
+    nombre_mes = MESES_RESUMEN[mes - 1]
+    hoja = libro.add_worksheet(f"{nombre_mes} {anio}")
+
+    tabla = tabla_cuadrante(df_mes, modo_movil=False)
+    dias = list(tabla.columns)
+    ultima_col = COL_DIAS + max(len(dias), 1) - 1
+
+    # ---------- PÁGINA ----------
+    hoja.set_landscape()
+    hoja.set_paper(8)   # A3
+    hoja.fit_to_pages(1, 0)
+    hoja.center_horizontally()
+    hoja.center_vertically()
+    hoja.set_margins(left=0.25, right=0.25, top=0.75, bottom=0.75)
+    hoja.freeze_panes(FILA_TRABAJADORES, COL_DIAS)
+
+    for col, ancho in ANCHO_COLUMNAS.items():
+        hoja.set_column(col, col, ancho)
+    hoja.set_column(COL_DIAS, ultima_col, ANCHO_DIA)
+
+    # ---------- ESCUDO Y TÍTULO ----------
+    hoja.set_row(0, ALTO_ESCUDO)
+    if escudo and os.path.exists(escudo):
+        hoja.insert_image(0, 0, escudo, {"x_scale": 0.33, "y_scale": 0.33, "x_offset": 150, "y_offset": 4})
+
+    hoja.set_row(FILA_TITULO, ALTO_TITULO)
+    hoja.merge_range(
+        FILA_TITULO, 0, FILA_TITULO, ultima_col,
+        f"CUADRANTE DE SERVICIO PARA EL MES DE {nombre_mes.upper()} DE {anio}",
+        formatos.titulo
+    )
+
+    # ---------- CABECERA (DOS FILAS) ----------
+    fila = FILA_CABECERA
+    hoja.set_row(fila, ALTO_FILA)
+    hoja.set_row(fila + 1, ALTO_FILA)
+
+    titulos = ("Nombre y Apellidos", "Categoría", "N.I.P.")
+    for col, texto in enumerate(titulos):
+        hoja.write_string(fila, col, texto, formatos.cabecera)
+    hoja.merge_range(fila, COL_DIAS, fila, ultima_col, "Días (Turnos y Descanso)", formatos.cabecera_dias)
+    for col, texto in enumerate(titulos):
+        hoja.merge_range(fila, col, fila + 1, col, texto, formatos.cabecera)
+
+    for col, d in enumerate(dias, start=COL_DIAS):
+        fecha = date(anio, mes, int(d))
+        festivo = fecha.weekday() == 6 or (es_festivo and es_festivo(fecha))
+        hoja.write_string(fila + 1, col, f"{int(d):02d}", formatos.dia_festivo if festivo else formatos.dia)
+
+    # ---------- TRABAJADORES ----------
+    fila = FILA_TRABAJADORES
+    for i, (datos, valores) in enumerate(zip(tabla.index, tabla.to_numpy())):
+        hoja.set_row(fila, ALTO_FILA)
+        hoja.set_row(fila + 1, ALTO_FILA)
+        _escribir_fila_trabajador(hoja, formatos, fila, datos, valores, formatos.trabajador[(i + 1) % 2])
+        fila += 2
+
+    # ---------- MAÑANAS / TARDES / NOCHES ----------
+    # Mismo conteo que la tabla de la app (no fórmulas COUNTIF)
+    conteos = cobertura_diaria(tabla) if len(tabla) else None
+    fila += 2
+
+    for franja, titulo, horario, _, _ in FILAS_CONTEO:
+        etiqueta, numero = formatos.conteo[franja]
+        hoja.set_row(fila, ALTO_CONTEO)
+        hoja.merge_range(fila, 0, fila, 1, titulo, etiqueta)
+        hoja.write_string(fila, 2, horario, etiqueta)
+        if conteos is not None:
+            for col, v in enumerate(conteos.loc[franja].tolist(), start=COL_DIAS):
+                hoja.write_number(fila, col, int(v), numero)
+        fila += 1
+
+# ==================================================
+# LIBRO
+# ==================================================
+def exportar(meses, destino, es_festivo=es_festivo_por_defecto, escudo=ESCUDO_FILE):
+    """
+    Escribe un libro con una hoja por mes. `meses` es una lista de
+    (anio, mes, df_mes) con el cuadrante aplicado de cada mes (formato
+    largo) y `destino` una ruta o un fichero binario (BytesIO).
+    """
+    libro = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    formatos = _Formatos(libro)
+
+    for anio, mes, df_mes in meses:
+        _escribir_mes(libro, formatos, anio, mes, df_mes, es_festivo, escudo)
+
+    libro.close()
+    return destino
+
+def exportar_bytes(meses, **kwargs):
+    """Igual que exportar(), pero devuelve el .xlsx en memoria."""
+    salida = io.BytesIO()
+    exportar(meses, salida, **kwargs)
+    return salida.getvalue()
+
+def nombre_fichero(anio, mes=None):
+    if mes is None:
+        return f"Cuadrante {anio}.xlsx"
+    return f"{mes:02d} - Cuadrante {MESES_RESUMEN[mes - 1]} {anio}.xlsx"
+
+def meses_aplicados(meses):
+    """
+    [(anio, mes, df_mes)] a partir de (anio, mes, ruta_csv, df_hist), con
+    el historial aplicado (snapshots compartidos con la app).
+    """
+    resultado = []
+    for anio, mes, ruta, df_hist in meses:
+        df, _ = cuadrante_aplicado(df_hist, ruta)
+        resultado.append((anio, mes, df[(df["anio"] == anio) & (df["mes"] == mes)]))
+    return resultado
+
+def main():
+    import persistencia
+
+    parser = argparse.ArgumentParser(description="Exporta el cuadrante aplicado a Excel con el formato de la plantilla.")
+    parser.add_argument("anio", type=int)
+    parser.add_argument("--mes", type=int, help="sólo este mes (por defecto, todo el año)")
+    parser.add_argument("-o", "--salida", help="fichero .xlsx de salida")
+    args = parser.parse_args()
+
+    token = os.environ["GITHUB_TOKEN"]
+    meses = [
+        (anio, mes, ruta, persistencia.cargar_historial_mes(anio, mes, token))
+        for anio, mes, ruta in meses_del_anio(args.anio)
+        if args.mes is None or mes == args.mes
+    ]
+    if not meses:
+        parser.error(f"no hay cuadrantes de {args.anio}")
+
+    salida = args.salida or nombre_fichero(args.anio, args.mes)
+    exportar(meses_aplicados(meses), salida)
+    print(f"{len(meses)} meses exportados a {salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Importación de los cuadrantes mensuales en Excel ("01 - Cuadrante Enero
+2026.xlsx") a cuadrantes/AAAA_MM.csv.
+
+El libro se lee con openpyxl en modo read_only: sólo valores, fila a
+fila y sin cargar estilos ni hojas enteras en memoria. Cada hoja
+"<Mes> <Año>" se convierte al formato largo del CSV (una fila por
+trabajador y día) y al escribirlo se deja preparada también su caché
+columnar (datos.guardar_mes_csv).
+
+Formato de la hoja (el de "Plantilla de exportación.xlsx"):
+
+- Una fila con "N.I.P." y "Días (Turnos y Descanso)" y debajo los
+  números de día. Las columnas anteriores a "Días" (finales del mes
+  anterior) se ignoran.
+- Dos filas por trabajador. En la primera va el turno. En la segunda
+  los cambios: un código sustituye al de arriba, "yN" se le añade
+  ("2" + "y3" -> "2y3") y el texto que no es un código (notas como
+  "JEFATURA") se ignora.
+- Vacaciones y bajas se escriben en una celda combinada sobre varios
+  días: se repiten en las celdas vacías que siguen.
+
+Uso:
+
+    python importar.py "01 - Cuadrante Enero 2026.xlsx" [...] [--sobrescribir]
+"""
+import argparse
+import os
+import re
+from datetime import date
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from datos import CUADRANTES_DIR, guardar_mes_csv, normalizar_nip
+from resumen import MESES_RESUMEN
+from turnos import registro, DOBLES, TURNOS_EDITABLES
+
+COLUMNAS_CSV = ["Año", "Mes", "Fecha", "Día", "NIP", "Nombre y Apellidos", "Categoría", "Turno", "Tipo"]
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+# Textos de la hoja que corresponden a un código
+ALIAS = {"VACACIONES": "Vac", "V A C A C I O N E S": "Vac"}
+
+# Texto de la columna Tipo con la redacción de los CSV existentes (los
+# demás códigos usan el nombre del registro)
+TIPOS = {
+    "1": "Mañana", "2": "Tarde", "3": "Noche", "L": "Laborable", "D": "Descanso",
+    "Vac": "Vacaciones", "BAJA": "Baja", "perm": "Permiso", "AP": "Asuntos Particulares",
+    "Ts": "Tiempo Sindical", "EV": "Educación Vial", "Tir": "Tiro", "AGASP": "AGASP",
+    "Dcc": "Descanso Compensación Curso", "Dcj": "Descanso Compensación Juicio",
+    "Dcv": "Descanso Compensación Verano", "Dcu": "Descanso Compensación Cuadrante",
+    "Dct": "Descanso compensado tiro",
+}
+
+# Códigos que siguen en las celdas vacías de la derecha (celdas combinadas)
+CONTINUAN = {"Vac", "BAJA"}
+
+COMBINADOS = set(TURNOS_EDITABLES) | DOBLES
+
+NIP_VALIDO = re.compile(r"^[A-Z]?\d{6}$")
+
+# ==================================================
+# CELDAS
+# ==================================================
+def _texto(valor):
+    """Valor de una celda como texto ("3.0" -> "3"); None si está vacía."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return ALIAS.get(texto, texto) or None
+
+def _combinar(arriba, abajo):
+    """Turno del día a partir de las dos filas del trabajador."""
+    if abajo is None:
+        return arriba
+    if abajo.startswith("y") and arriba:
+        codigo = f"{arriba}{abajo}"
+        # "3" + "y2" se escribe "2y3", como en los turnos asignables
+        invertido = f"{abajo[1:]}y{arriba}"
+        if codigo not in COMBINADOS and invertido in COMBINADOS:
+            codigo = invertido
+        return codigo
+    if registro.info(abajo).conocido:
+        return abajo
+    return arriba
+
+def tipo(codigo):
+    """Texto de la columna Tipo ("2y3" -> "Tarde y Noche")."""
+    if not codigo:
+        return ""
+    return " y ".join(TIPOS.get(p) or registro.nombre(p) for p in registro.partes(codigo))
+
+def _conservar_tipos(df_csv, ruta):
+    """
+    Donde el turno no cambia, el Tipo del CSV que ya existe: esos textos
+    se escribieron a mano y no siempre coinciden con TIPOS.
+    """
+    if not os.path.exists(ruta):
+        return df_csv
+    previo = pd.read_csv(ruta, dtype=str, keep_default_na=False, usecols=["NIP", "Fecha", "Turno", "Tipo"])
+    previo["NIP"] = previo["NIP"].map(normalizar_nip)
+    unido = df_csv[["NIP", "Fecha", "Turno"]].merge(previo, on=["NIP", "Fecha", "Turno"], how="left")
+    return df_csv.assign(Tipo=unido["Tipo"].fillna(df_csv["Tipo"]).to_numpy())
+
+# ==================================================
+# HOJA
+# ==================================================
+def mes_de_hoja(nombre):
+    """(anio, mes) de una hoja "Enero 2026", o None."""
+    partes = nombre.split()
+    if len(partes) != 2 or not partes[1].isdigit():
+        return None
+    meses = [m.lower() for m in MESES_RESUMEN]
+    if partes[0].lower() not in meses:
+        return None
+    return int(partes[1]), meses.index(partes[0].lower()) + 1
+
+def _columnas(cabecera, dias):
+    """Posiciones de nombre, categoría, NIP y de cada día del mes."""
+    textos = [_texto(v) for v in cabecera]
+    inicio = next(i for i, t in enumerate(textos) if t and t.startswith("Días"))
+
+    columnas_dias = []
+    for i in range(inicio, len(dias)):
+        t = _texto(dias[i])
+        if t is None or not t.isdigit() or int(t) != len(columnas_dias) + 1:
+            break
+        columnas_dias.append(i)
+
+    return (
+        textos.index("Nombre y Apellidos"),
+        textos.index("Categoría"),
+        textos.index("N.I.P."),
+        columnas_dias,
+    )
+
+def leer_hoja(hoja, anio, mes):
+    """
+    Cuadrante de una hoja en el formato del CSV (DataFrame con
+    COLUMNAS_CSV). Recorre las filas una sola vez.
+    """
+    filas = hoja.iter_rows(values_only=True)
+
+    # ---------- CABECERA ----------
+    for fila in filas:
+        if "N.I.P." in (_texto(v) for v in fila):
+            cabecera = fila
+            break
+    else:
+        raise ValueError(f"La hoja {hoja.title!r} no tiene la cabecera del cuadrante")
+
+    col_nombre, col_cat, col_nip, columnas_dias = _columnas(cabecera, next(filas, ()))
+    fechas = [date(anio, mes, d) for d in range(1, len(columnas_dias) + 1)]
+    textos_fecha = [f.isoformat() for f in fechas]
+    textos_dia = [DIAS_SEMANA[f.weekday()] for f in fechas]
+
+    registros = []
+
+    def añadir(trabajador, abajo):
+        nip, nombre, categoria, valores = trabajador
+        cambios = [_texto(abajo[c]) if abajo and c < len(abajo) else None for c in columnas_dias]
+
+        anterior = None
+        for i, (arriba, cambio) in enumerate(zip(valores, cambios)):
+            if arriba is None and anterior in CONTINUAN:
+                arriba = anterior
+            codigo = _combinar(arriba, cambio) or ""
+            anterior = arriba
+
+            registros.append((
+                anio, mes, textos_fecha[i], textos_dia[i], nip, nombre, categoria, codigo, tipo(codigo)
+            ))
+
+    # ---------- TRABAJADORES (DOS FILAS CADA UNO) ----------
+    pendiente = None
+    for fila in filas:
+        nip = _texto(fila[col_nip]) if col_nip < len(fila) else None
+        nip = normalizar_nip(nip) if nip else None
+
+        if nip and NIP_VALIDO.match(nip):
+            if pendiente:
+                añadir(pendiente, None)
+            pendiente = (
+                nip, _texto(fila[col_nombre]) or "", _texto(fila[col_cat]) or "",
+                [_texto(fila[c]) if c < len(fila) else None for c in columnas_dias],
+            )
+        elif pendiente:
+            añadir(pendiente, fila)
+            pendiente = None
+
+    if pendiente:
+        añadir(pendiente, None)
+
+    return pd.DataFrame(registros, columns=COLUMNAS_CSV)
+
+# ==================================================
+# LIBRO
+# ==================================================
+def ruta_mes(anio, mes, directorio=CUADRANTES_DIR):
+    return os.path.join(directorio, f"{anio}_{mes:02d}.csv")
+
+def importar(origen, directorio=CUADRANTES_DIR, sobrescribir=False):
+    """
+    Importa las hojas "<Mes> <Año>" de un libro (ruta o fichero binario).
+    Sin `sobrescribir` no toca los meses que ya existen. Devuelve un dict
+    por hoja con anio, mes, ruta, trabajadores, filas, desconocidos
+    (códigos que no están en el registro), escrito y csv (DataFrame).
+    """
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    resultados = []
+
+    try:
+        for hoja in libro.worksheets:
+            anio_mes = mes_de_hoja(hoja.title)
+            if anio_mes is None:
+                continue
+            anio, mes = anio_mes
+
+            # Algunos programas guardan mal las dimensiones de la hoja
+            hoja.reset_dimensions()
+            df_csv = leer_hoja(hoja, anio, mes)
+
+            ruta = ruta_mes(anio, mes, directorio)
+            escrito = sobrescribir or not os.path.exists(ruta)
+            if escrito and not df_csv.empty:
+                df_csv = _conservar_tipos(df_csv, ruta)
+                os.makedirs(directorio, exist_ok=True)
+                guardar_mes_csv(df_csv, ruta)
+
+            resultados.append({
+                "anio": anio,
+                "mes": mes,
+                "ruta": ruta,
+                "trabajadores": df_csv["NIP"].nunique(),
+                "filas": len(df_csv),
+                "desconocidos": sorted(registro.validar(df_csv["Turno"][df_csv["Turno"] != ""])),
+                "escrito": escrito and not df_csv.empty,
+                "csv": df_csv,
+            })
+    finally:
+        libro.close()
+
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa cuadrantes mensuales en Excel a cuadrantes/AAAA_MM.csv.")
+    parser.add_argument("libros", nargs="+")
+    parser.add_argument("--sobrescribir", action="store_true", help="reemplaza los meses que ya existen")
+    parser.add_argument("--directorio", default=CUADRANTES_DIR)
+    args = parser.parse_args()
+
+    for libro in args.libros:
+        for r in importar(libro, args.directorio, args.sobrescribir):
+            estado = "importado" if r["escrito"] else "ya existe (usa --sobrescribir)"
+            print(f"{r['ruta']}: {r['trabajadores']} trabajadores, {r['filas']} filas, {estado}")
+            if r["desconocidos"]:
+                print(f"  códigos desconocidos: {', '.join(r['desconocidos'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,672 @@
+"""
+Persistencia en GitHub (API de contenidos).
+
+La descarga del historial es condicional: se guarda el ETag y el
+DataFrame ya parseado, y se pide con If-None-Match. Si GitHub responde
+304 se reutiliza el DataFrame (y no se consume cuota de la API).
+
+El historial está repartido por meses (historial/AAAA_MM.csv, según
+fecha_turno) y sólo se escribe añadiendo al final del mes afectado.
+El antiguo historial_cambios.csv se sigue leyendo para los meses que
+todavía no tienen fichero propio; el primer cambio de cada mes crea su
+fichero con las filas antiguas de ese mes.
+
+Los cambios nuevos se guardan con la Git Data API: todos los ficheros
+afectados van en un único commit, sean uno o cincuenta cambios. Editar o
+eliminar un registro también va por ahí, releyendo el fichero del mes en
+cada intento.
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from io import StringIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger(__name__)
+
+GITHUB_API = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_USER = "samuelfdezp-rgb"
+GITHUB_REPO = "Cuadrante-2026"
+GITHUB_BRANCH = "main"
+
+HISTORIAL_LEGADO = "historial_cambios.csv"
+HISTORIAL_DIR = "historial"
+
+COLUMNAS_HISTORIAL = [
+    "fecha_hora", "usuario_admin", "nip_afectado",
+    "nombre_afectado", "fecha_turno",
+    "turno_anterior", "turno_nuevo", "observaciones"
+]
+
+# Columnas de texto del historial: leídas sin dtype, un mes con sólo
+# códigos numéricos daría enteros (032013 -> 32013, "1" -> 1)
+TIPOS_HISTORIAL = {
+    c: str for c in (
+        "usuario_admin", "nip_afectado", "nombre_afectado",
+        "turno_anterior", "turno_nuevo", "observaciones"
+    )
+}
+
+# ruta -> {"etag", "df", "comprobado"}   (df None = no existe)
+_cache_descargas = {}
+_cache_legado_mes = {}
+_lock = threading.Lock()
+
+class ErrorGitHub(Exception):
+    def __init__(self, mensaje, status=None, texto=""):
+        super().__init__(mensaje)
+        self.status = status
+        self.texto = texto
+
+# ==================================================
+# CLIENTE HTTP
+# ==================================================
+class ClienteGitHub:
+    """
+    Sesión HTTP compartida por todas las llamadas a GitHub:
+    conexiones reutilizadas (keep-alive), timeouts de conexión y lectura,
+    reintentos de los GET ante errores de red o 5xx y contadores de
+    latencia por tipo de llamada.
+    """
+
+    def __init__(self, api=GITHUB_API, timeout=(3.05, 15), reintentos=3, sesion=None):
+        self.api = api.rstrip("/")
+        self.timeout = timeout
+        self.sesion = sesion or self._nueva_sesion(reintentos)
+        self._lock = threading.Lock()
+        self._latencias = {}
+
+    @staticmethod
+    def _nueva_sesion(reintentos):
+        reintento = Retry(
+            total=reintentos,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),   # escribir dos veces no es seguro
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=16, max_retries=reintento)
+
+        sesion = requests.Session()
+        sesion.mount("https://", adaptador)
+        sesion.mount("http://", adaptador)
+        return sesion
+
+    def _tipo(self, metodo, url):
+        # .../repos/<usuario>/<repo>/contents/x -> "GET contents"
+        ruta = url.split(f"/{GITHUB_REPO}/", 1)[-1]
+        partes = ruta.split("/")
+        tipo = "/".join(partes[:2]) if partes[0] == "git" else partes[0]
+        return f"{metodo} {tipo}"
+
+    def pedir(self, metodo, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        inicio = time.perf_counter()
+        error = True
+
+        try:
+            r = self.sesion.request(metodo, url, **kwargs)
+            error = r.status_code >= 500
+            return r
+        except requests.RequestException as e:
+            raise ErrorGitHub("No se pudo conectar con GitHub", texto=str(e)) from e
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            tipo = self._tipo(metodo, url)
+            with self._lock:
+                c = self._latencias.setdefault(
+                    tipo, {"llamadas": 0, "errores": 0, "total_ms": 0.0, "max_ms": 0.0}
+                )
+                c["llamadas"] += 1
+                c["errores"] += error
+                c["total_ms"] += ms
+                c["max_ms"] = max(c["max_ms"], ms)
+
+    def get(self, url, **kwargs):
+        return self.pedir("GET", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.pedir("PUT", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.pedir("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.pedir("PATCH", url, **kwargs)
+
+    def estadisticas(self):
+        """{tipo: {llamadas, errores, total_ms, max_ms, media_ms}}"""
+        with self._lock:
+            return {
+                tipo: dict(c, media_ms=c["total_ms"] / c["llamadas"])
+                for tipo, c in self._latencias.items()
+            }
+
+cliente = ClienteGitHub()
+
+def usar_cliente(nuevo):
+    """Sustituye el cliente (p. ej. por uno contra un servidor local en pruebas)."""
+    global cliente
+    cliente = nuevo
+
+def url_contenido(ruta_repo):
+    return f"{cliente.api}/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{ruta_repo}"
+
+def cabeceras(token):
+    return {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github+json"
+    }
+
+def historial_vacio():
+    return pd.DataFrame(columns=COLUMNAS_HISTORIAL)
+
+def caducar(ruta_repo):
+    """La próxima descarga pregunta a GitHub aunque no haya pasado el intervalo."""
+    entrada = _cache_descargas.get(ruta_repo)
+    if entrada:
+        entrada["comprobado"] = float("-inf")
+
+def cargar_csv_desde_github(ruta_repo, token, parse_dates=None, refresco_min=0, dtype=None):
+    """
+    Descarga un CSV del repositorio y lo devuelve como DataFrame
+    (None si no existe).
+
+    - Si la última comprobación tiene menos de `refresco_min` segundos,
+      se devuelve lo que ya tenemos sin preguntar a GitHub.
+    - Si GitHub responde 304, se devuelve el mismo DataFrame de la vez
+      anterior (mismo objeto, así las cachés posteriores lo reconocen).
+    - Ante un error de GitHub se sigue usando la última copia buena; si
+      no hay ninguna, se lanza ErrorGitHub.
+    """
+    entrada = _cache_descargas.get(ruta_repo)
+    ahora = time.monotonic()
+
+    if entrada and ahora - entrada["comprobado"] < refresco_min:
+        return entrada["df"]
+
+    headers = cabeceras(token)
+    if entrada and entrada["etag"]:
+        headers["If-None-Match"] = entrada["etag"]
+
+    try:
+        r = cliente.get(url_contenido(ruta_repo), headers=headers)
+    except ErrorGitHub:
+        # Sin conexión: mejor datos de hace un rato que ningún dato
+        if entrada:
+            return entrada["df"]
+        raise
+
+    if r.status_code == 304 and entrada:
+        entrada["comprobado"] = ahora
+        return entrada["df"]
+
+    if r.status_code == 200:
+        datos = r.json()
+        csv_content = base64.b64decode(datos["content"]).decode()
+        df = pd.read_csv(StringIO(csv_content), parse_dates=parse_dates, dtype=dtype)
+
+        with _lock:
+            _cache_descargas[ruta_repo] = {
+                "etag": r.headers.get("ETag"),
+                "df": df,
+                "comprobado": ahora,
+            }
+        return df
+
+    if r.status_code == 404:
+        with _lock:
+            _cache_descargas[ruta_repo] = {
+                "etag": None, "df": None, "comprobado": ahora
+            }
+        return None
+
+    # Error de GitHub: mejor datos de hace un rato que ningún dato
+    if entrada:
+        return entrada["df"]
+    raise ErrorGitHub("Error descargando de GitHub", r.status_code, r.text)
+
+# ==================================================
+# HISTORIAL POR MESES
+# ==================================================
+def ruta_historial_mes(anio, mes):
+    return f"{HISTORIAL_DIR}/{int(anio)}_{int(mes):02d}.csv"
+
+def _filtrar_mes(df_hist, anio, mes):
+    fechas = pd.to_datetime(df_hist["fecha_turno"])
+    return df_hist[(fechas.dt.year == anio) & (fechas.dt.month == mes)]
+
+def _legado_del_mes(anio, mes, token, refresco_min=0):
+    legado = cargar_csv_desde_github(
+        HISTORIAL_LEGADO, token,
+        parse_dates=["fecha_turno", "fecha_hora"],
+        dtype=TIPOS_HISTORIAL,
+        refresco_min=refresco_min
+    )
+    if legado is None:
+        return historial_vacio()
+
+    # Mismo DataFrame de origen -> mismo recorte (las cachés lo reconocen)
+    previo = _cache_legado_mes.get((anio, mes))
+    if previo and previo[0] is legado:
+        return previo[1]
+
+    df_mes = _filtrar_mes(legado, anio, mes)
+    with _lock:
+        _cache_legado_mes[(anio, mes)] = (legado, df_mes)
+    return df_mes
+
+def cargar_historial_mes(anio, mes, token, refresco_min=0):
+    """
+    Historial de los turnos de un mes. Sólo descarga el fichero de ese mes
+    (o, si aún no existe, el historial antiguo recortado a ese mes).
+    """
+    df = cargar_csv_desde_github(
+        ruta_historial_mes(anio, mes), token,
+        parse_dates=["fecha_turno", "fecha_hora"],
+        dtype=TIPOS_HISTORIAL,
+        refresco_min=refresco_min
+    )
+    if df is None:
+        df = _legado_del_mes(anio, mes, token, refresco_min)
+    return escritura.con_pendientes(df, anio, mes)
+
+def _claves_registro(df_hist):
+    """Identifica un registro sin depender de cómo se leyeron las columnas."""
+    return (
+        pd.to_datetime(df_hist["fecha_hora"]).dt.strftime("%Y-%m-%d %H:%M:%S") + "|" +
+        df_hist["nip_afectado"].map(lambda n: str(n).strip().zfill(6)) + "|" +
+        pd.to_datetime(df_hist["fecha_turno"]).dt.strftime("%Y-%m-%d") + "|" +
+        df_hist["turno_nuevo"].astype(str)
+    )
+
+def _historial_a_csv(df_hist):
+    """Fechas siempre con el mismo formato, vengan como texto o como fecha."""
+    df_hist = df_hist.copy()
+    df_hist["fecha_hora"] = pd.to_datetime(df_hist["fecha_hora"]).dt.strftime("%Y-%m-%d %H:%M:%S")
+    df_hist["fecha_turno"] = pd.to_datetime(df_hist["fecha_turno"]).dt.strftime("%Y-%m-%d")
+    return df_hist.to_csv(index=False)
+
+def guardar_csv_en_github(contenido, ruta_repo, token, mensaje=None):
+    """Sube (crea o reemplaza) un fichero de texto. Lanza ErrorGitHub si falla."""
+    url = url_contenido(ruta_repo)
+    headers = cabeceras(token)
+
+    content_b64 = base64.b64encode(contenido.encode()).decode()
+
+    # Comprobar si existe
+    r = cliente.get(url, headers=headers)
+
+    sha = None
+    if r.status_code == 200:
+        sha = r.json()["sha"]
+    elif r.status_code != 404:
+        raise ErrorGitHub("Error consultando GitHub", r.status_code, r.text)
+
+    payload = {
+        "message": mensaje or f"Actualiza {ruta_repo}",
+        "content": content_b64,
+        "branch": GITHUB_BRANCH
+    }
+
+    if sha:
+        payload["sha"] = sha
+
+    r = cliente.put(url, headers=headers, json=payload)
+
+    if r.status_code not in (200, 201):
+        raise ErrorGitHub("Error guardando en GitHub", r.status_code, r.text)
+
+    caducar(ruta_repo)
+
+# ==================================================
+# COMMITS CON VARIOS FICHEROS (GIT DATA API)
+# ==================================================
+def url_git(recurso):
+    return f"{cliente.api}/repos/{GITHUB_USER}/{GITHUB_REPO}/git/{recurso}"
+
+def _leer_en_commit(ruta_repo, sha_commit, token):
+    """Contenido de un fichero en un commit concreto (None si no existe)."""
+    r = cliente.get(
+        url_contenido(ruta_repo),
+        headers=cabeceras(token),
+        params={"ref": sha_commit}
+    )
+    if r.status_code == 404:
+        return None
+    if r.status_code != 200:
+        raise ErrorGitHub("Error consultando GitHub", r.status_code, r.text)
+    return base64.b64decode(r.json()["content"]).decode()
+
+def _commit_actual(token):
+    r = cliente.get(url_git(f"ref/heads/{GITHUB_BRANCH}"), headers=cabeceras(token))
+    if r.status_code != 200:
+        raise ErrorGitHub("Error consultando la rama", r.status_code, r.text)
+    sha_commit = r.json()["object"]["sha"]
+
+    r = cliente.get(url_git(f"commits/{sha_commit}"), headers=cabeceras(token))
+    if r.status_code != 200:
+        raise ErrorGitHub("Error consultando el commit", r.status_code, r.text)
+    return sha_commit, r.json()["tree"]["sha"]
+
+def commit_ficheros(preparar, token, mensaje, intentos=3):
+    """
+    Crea UN commit con varios ficheros: árbol + commit + mover la rama.
+
+    `preparar(leer)` recibe una función leer(ruta) que devuelve el contenido
+    del fichero en el commit de partida, y devuelve {ruta: contenido nuevo}.
+    Si otra persona ha hecho un commit entretanto, la rama no avanza
+    (GitHub responde 422) y se vuelve a preparar sobre el commit nuevo.
+    """
+    for _ in range(intentos):
+        sha_padre, sha_arbol = _commit_actual(token)
+        ficheros = preparar(lambda ruta: _leer_en_commit(ruta, sha_padre, token))
+        if not ficheros:
+            return
+
+        r = cliente.post(url_git("trees"), headers=cabeceras(token), json={
+            "base_tree": sha_arbol,
+            "tree": [
+                {"path": ruta, "mode": "100644", "type": "blob", "content": contenido}
+                for ruta, contenido in ficheros.items()
+            ]
+        })
+        if r.status_code != 201:
+            raise ErrorGitHub("Error creando el árbol", r.status_code, r.text)
+
+        r = cliente.post(url_git("commits"), headers=cabeceras(token), json={
+            "message": mensaje,
+            "tree": r.json()["sha"],
+            "parents": [sha_padre]
+        })
+        if r.status_code != 201:
+            raise ErrorGitHub("Error creando el commit", r.status_code, r.text)
+
+        r = cliente.patch(
+            url_git(f"refs/heads/{GITHUB_BRANCH}"),
+            headers=cabeceras(token),
+            json={"sha": r.json()["sha"], "force": False}
+        )
+        if r.status_code == 200:
+            for ruta in ficheros:
+                caducar(ruta)
+            return
+        if r.status_code != 422:
+            raise ErrorGitHub("Error actualizando la rama", r.status_code, r.text)
+
+    raise ErrorGitHub("La rama ha cambiado demasiadas veces, inténtalo de nuevo", 422)
+
+def _leer_legado(leer):
+    texto = leer(HISTORIAL_LEGADO)
+    return historial_vacio() if texto is None else pd.read_csv(StringIO(texto), dtype=TIPOS_HISTORIAL)
+
+def clave_registro(df_hist, indice):
+    """Clave de la fila `indice` para editar_historial_mes()."""
+    return _claves_registro(df_hist.loc[[indice]]).iloc[0]
+
+def editar_historial_mes(anio, mes, clave, cambios, token):
+    """
+    Edita (`cambios` = {columna: valor}) o elimina (`cambios` None) el
+    registro `clave` del fichero del mes. Va en un commit de
+    commit_ficheros(): el fichero se relee en cada intento, así que no se
+    pisa lo que haya subido entretanto la escritura en segundo plano.
+
+    Si el registro todavía está en la cola de subida se cambia allí y no
+    se toca GitHub.
+    """
+    if escritura.modificar(clave, cambios):
+        return
+
+    ruta = ruta_historial_mes(anio, mes)
+
+    def preparar(leer):
+        texto = leer(ruta)
+        if texto is not None:
+            actual = pd.read_csv(StringIO(texto), dtype=TIPOS_HISTORIAL)
+        else:
+            # Mes sin fichero propio: se crea con sus filas del historial antiguo
+            legado = _leer_legado(leer)
+            actual = _filtrar_mes(legado, anio, mes) if not legado.empty else legado
+
+        es = (_claves_registro(actual) == clave).to_numpy() if not actual.empty else []
+        if not any(es):
+            raise ErrorGitHub("El registro ya no está en el historial", 404)
+
+        if cambios is None:
+            actual = actual[~es]
+        else:
+            for columna, valor in cambios.items():
+                actual.loc[es, columna] = valor
+        return {ruta: _historial_a_csv(actual)}
+
+    commit_ficheros(
+        preparar, token,
+        mensaje=f"{'Edita' if cambios is not None else 'Elimina'} registro del historial {int(anio)}-{int(mes):02d}"
+    )
+
+def anadir_a_historial(registros, token):
+    """
+    Añade registros (dicts con las COLUMNAS_HISTORIAL) al final del
+    fichero del mes de su fecha_turno. Todos los meses afectados se
+    guardan en un único commit.
+    """
+    nuevos = pd.DataFrame(registros, columns=COLUMNAS_HISTORIAL)
+    fechas = pd.to_datetime(nuevos["fecha_turno"])
+    grupos = list(nuevos.groupby([fechas.dt.year, fechas.dt.month], sort=True))
+
+    def preparar(leer):
+        legado = None
+        ficheros = {}
+
+        for (anio, mes), grupo in grupos:
+            ruta = ruta_historial_mes(anio, mes)
+            texto = leer(ruta)
+
+            if texto is not None:
+                actual = pd.read_csv(StringIO(texto), dtype=TIPOS_HISTORIAL)
+            else:
+                # Mes sin fichero propio: se crea con sus filas del historial antiguo
+                if legado is None:
+                    legado = _leer_legado(leer)
+                actual = _filtrar_mes(legado, anio, mes) if not legado.empty else legado
+
+            if actual.empty:
+                df_mes = grupo
+            else:
+                # Si un reintento ya llegó a guardarse, no se duplica
+                ya_estan = _claves_registro(grupo).isin(_claves_registro(actual))
+                if ya_estan.all():
+                    continue
+
+                df_mes = pd.concat(
+                    [actual.reindex(columns=COLUMNAS_HISTORIAL), grupo[~ya_estan]],
+                    ignore_index=True
+                )
+            ficheros[ruta] = _historial_a_csv(df_mes)
+
+        return ficheros
+
+    n = len(nuevos)
+    return commit_ficheros(
+        preparar, token,
+        mensaje=f"Cambio de turno ({n} registro{'s' if n != 1 else ''})"
+    )
+
+# ==================================================
+# ESCRITURA EN SEGUNDO PLANO
+# ==================================================
+class EscrituraDiferida:
+    """
+    Cola de registros pendientes de subir a GitHub.
+
+    encolar() vuelve al momento: los registros se ven enseguida porque
+    cargar_historial_mes() los añade a lo descargado, y un hilo los sube
+    en un único commit. Si falla, reintenta con espera creciente. Si otra
+    persona ha guardado entretanto, commit_ficheros() relee y vuelve a
+    añadir. La cola se guarda en disco para no perderla si se reinicia el
+    proceso.
+    """
+
+    ESPERA_MAX = 60
+
+    def __init__(self, ruta_cola):
+        self.ruta_cola = ruta_cola
+        self.token = None
+        self.ultimo_error = None
+        self._pendientes = self._leer_cola()
+        self._subiendo = 0      # los primeros N de la cola van en el commit en curso
+        self._version = 0
+        self._cache_mes = {}
+        self._cond = threading.Condition()
+        self._hilo = None
+
+    # ---------- COLA EN DISCO ----------
+    def _leer_cola(self):
+        try:
+            with open(self.ruta_cola, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _guardar_cola(self):
+        try:
+            tmp = f"{self.ruta_cola}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._pendientes, f, ensure_ascii=False)
+            os.replace(tmp, self.ruta_cola)
+        except OSError:
+            pass
+
+    # ---------- API ----------
+    def iniciar(self, token):
+        """Arranca el hilo (una vez por proceso)."""
+        with self._cond:
+            self.token = token
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(
+                    target=self._bucle, name="escritura-github", daemon=True
+                )
+                self._hilo.start()
+            if self._pendientes:
+                self._cond.notify()
+
+    def encolar(self, registros):
+        with self._cond:
+            self._pendientes.extend(dict(r) for r in registros)
+            self._version += 1
+            self._guardar_cola()
+            self._cond.notify_all()
+
+    def pendientes(self):
+        with self._cond:
+            return list(self._pendientes)
+
+    def modificar(self, clave, cambios=None, espera=30):
+        """
+        Edita (`cambios`) o quita (None) el registro `clave` si aún está en
+        la cola. Si va en el commit en curso, espera a que termine. Devuelve
+        False si no está en la cola (ya subido: hay que editarlo en GitHub).
+        """
+        limite = time.monotonic() + espera
+        with self._cond:
+            while True:
+                pos = self._posicion(clave)
+                if pos is None:
+                    return False
+                if pos >= self._subiendo:
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise ErrorGitHub("El registro se está subiendo a GitHub, inténtalo de nuevo en un momento")
+                self._cond.wait(restante)
+
+            if cambios is None:
+                del self._pendientes[pos]
+            else:
+                self._pendientes[pos].update(cambios)
+            self._version += 1
+            self._guardar_cola()
+            return True
+
+    def _posicion(self, clave):
+        if not self._pendientes:
+            return None
+        claves = list(_claves_registro(pd.DataFrame(self._pendientes, columns=COLUMNAS_HISTORIAL)))
+        return claves.index(clave) if clave in claves else None
+
+    def con_pendientes(self, df_hist, anio, mes):
+        """Historial del mes más los registros que aún no se han subido."""
+        with self._cond:
+            version = self._version
+            del_mes = [
+                r for r in self._pendientes
+                if r["fecha_turno"][:7] == f"{int(anio)}-{int(mes):02d}"
+            ]
+
+        if not del_mes:
+            return df_hist
+
+        # Mismo historial y misma cola -> mismo DataFrame
+        previo = self._cache_mes.get((anio, mes))
+        if previo and previo[0] is df_hist and previo[1] == version:
+            return previo[2]
+
+        nuevos = pd.DataFrame(del_mes, columns=COLUMNAS_HISTORIAL)
+        nuevos["fecha_hora"] = pd.to_datetime(nuevos["fecha_hora"])
+        nuevos["fecha_turno"] = pd.to_datetime(nuevos["fecha_turno"])
+
+        if not df_hist.empty:
+            nuevos = nuevos[~_claves_registro(nuevos).isin(_claves_registro(df_hist))]
+            nuevos = pd.concat([df_hist, nuevos], ignore_index=True)
+
+        self._cache_mes[(anio, mes)] = (df_hist, version, nuevos)
+        return nuevos
+
+    # ---------- HILO ----------
+    def _bucle(self):
+        espera = 1
+
+        while True:
+            with self._cond:
+                while not self._pendientes:
+                    self._cond.wait()
+                lote = list(self._pendientes)
+                self._subiendo = len(lote)
+                token = self.token
+
+            try:
+                anadir_a_historial(lote, token)
+            except Exception as e:
+                # Cualquier fallo (también uno inesperado, como una respuesta
+                # o un CSV mal formados) deja el lote en la cola y se reintenta:
+                # si el hilo muriese, la cola se quedaría parada
+                if isinstance(e, ErrorGitHub):
+                    log.warning("Subida del historial fallida, se reintenta en %d s: %s", espera, e)
+                    self.ultimo_error = str(e)
+                else:
+                    log.exception("Error inesperado subiendo el historial, se reintenta en %d s", espera)
+                    self.ultimo_error = f"{type(e).__name__}: {e}"
+                with self._cond:
+                    self._subiendo = 0
+                    self._cond.notify_all()
+                time.sleep(espera)
+                espera = min(espera * 2, self.ESPERA_MAX)
+                continue
+
+            with self._cond:
+                del self._pendientes[:len(lote)]
+                self._subiendo = 0
+                self._version += 1
+                self._guardar_cola()
+                self.ultimo_error = None
+                self._cond.notify_all()
+            espera = 1
+
+escritura = EscrituraDiferida(".historial_pendiente.json")
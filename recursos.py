@@ -0,0 +1,44 @@
+"""
+Imágenes estáticas de la app (Placa.png, cabecera.png).
+
+Cada imagen se lee (y si hace falta se reduce) una sola vez por proceso y
+versión del fichero. La app las muestra con st.image: Streamlit las guarda
+en su almacén de medios con un id que depende del contenido, así que en
+cada rerun sólo viaja la URL y el navegador reutiliza la imagen ya
+descargada, en lugar de reenviar el PNG en base64 dentro del HTML.
+"""
+import io
+import os
+from functools import lru_cache
+
+from PIL import Image
+
+# Ancho máximo de la cabecera en modo móvil
+ANCHO_MOVIL = 800
+
+@lru_cache(maxsize=16)
+def _imagen(ruta, version, ancho_max):
+    with open(ruta, "rb") as f:
+        datos = f.read()
+
+    if ancho_max is None:
+        return datos
+
+    with Image.open(io.BytesIO(datos)) as img:
+        if img.width <= ancho_max:
+            return datos
+
+        alto = round(img.height * ancho_max / img.width)
+        reducida = img.resize((ancho_max, alto), Image.LANCZOS)
+
+        salida = io.BytesIO()
+        reducida.save(salida, format="PNG", optimize=True)
+        return salida.getvalue()
+
+def imagen(ruta, ancho_max=None):
+    """
+    Bytes PNG de `ruta`, reducida a `ancho_max` píxeles si es más ancha.
+    Se vuelve a leer sólo si cambia el fichero.
+    """
+    st = os.stat(ruta)
+    return _imagen(ruta, (st.st_mtime_ns, st.st_size), ancho_max)
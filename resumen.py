@@ -0,0 +1,426 @@
+"""
+Resumen anual por trabajador calculado a partir del cuadrante aplicado.
+
+Todos los trabajadores se calculan a la vez: cada código distinto se
+descompone una sola vez en conceptos (Mañanas, Vacaciones, extras…) y el
+resto es un merge + groupby por (nip, concepto, mes). El resultado se
+guarda por versión del historial de los meses del año.
+
+Los cupos anuales ("21/54", "8/22") y las filas que no salen del
+cuadrante (ferias, jefaturas, horas) son propios de cada trabajador y se
+copian del resumen guardado en resumenes_csv/AAAA/<nip>.csv si existe.
+Esos archivos se mantienen a mano: la tabla muestra sus meses ya
+rellenos tal cual y sólo calcula los que faltan, y el lote sólo
+reescribe los que coinciden con lo calculado en esos meses.
+
+Uso en lote (escribe resumenes_csv/AAAA/<nip>.csv):
+
+    GITHUB_TOKEN=... python resumen.py 2026 [--sobrescribir]
+"""
+import argparse
+import csv
+import glob
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from datos import FESTIVOS, CUADRANTES_DIR, cuadrante_aplicado, version_mes
+from turnos import registro
+
+RESUMENES_DIR = "resumenes_csv"
+
+MESES_RESUMEN = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+# Resúmenes que se guardan a la vez (uno por año y versión)
+MAX_RESUMENES_EN_MEMORIA = 4
+
+# ==================================================
+# CONCEPTOS
+# ==================================================
+# Concepto -> partes de turno que suman un día
+CONCEPTOS = {
+    "Mañanas": {"1"},
+    "Tardes": {"2"},
+    "Noches": {"3"},
+    "Vacaciones": {"Vac", "VACACIONES"},
+    "AP's": {"AP"},
+    "Días de Trabajo Sindical": {"Ts"},
+    "Días de Baja": {"BAJA"},
+    "Días de Juicio": {"JuB", "JuC"},
+    "Permisos": {"perm"},
+    "Cursos": {"curso"},
+    "Descansos Compensados": {"Dc", "Dcv", "Dcc", "Dct", "Dcj", "Dcu"},
+    "Indisposiciones": {"indisp"},
+}
+
+CONCEPTO_DE_PARTE = {p: c for c, partes in CONCEPTOS.items() for p in partes}
+
+EXTRAS = ["1ex", "2ex", "3ex"]
+
+# Un juicio cuenta medio día, solo o junto a otro turno ("1yJuB")
+PESO_JUICIO = 0.5
+
+# Vacaciones y permisos cuentan sólo días laborables (lunes a viernes
+# que no son festivo)
+SOLO_LABORABLES = {"Vacaciones", "Permisos"}
+
+# Filas en el orden de resumenes_csv/
+FILAS = [
+    "Mañanas", "Tardes", "Noches", "Vacaciones", "AP's", "Ferias",
+    "Días de Trabajo Sindical", "Días de Baja", "Días de Juicio",
+    "Permisos", "Cursos", "Descansos Compensados", "Indisposiciones",
+    "Jefaturas de Servicio", "Festivos trabajados", "Fines de semana trabajados",
+    "Horas Trabajadas",
+] + [f"{e} (N)" for e in EXTRAS] + [f"{e} (F)" for e in EXTRAS]
+
+# Filas que no salen del cuadrante: se copian del resumen guardado
+FILAS_GUARDADAS = {"Ferias", "Jefaturas de Servicio", "Horas Trabajadas"}
+
+FILAS_CALCULADAS = [f for f in FILAS if f not in FILAS_GUARDADAS]
+
+# ==================================================
+# CÁLCULO
+# ==================================================
+def _conceptos_por_codigo(codigos):
+    """
+    Tabla (código, concepto, peso) con una fila por parte del código que
+    cuenta para algún concepto. Los extras quedan como "1ex", "2ex"… y se
+    separan después en normales (N) y festivos (F).
+    """
+    filas = []
+    for i, codigo in enumerate(codigos):
+        partes = registro.partes(codigo)
+        for p in partes:
+            if p in EXTRAS:
+                filas.append((i, p, 1.0))
+                continue
+            concepto = CONCEPTO_DE_PARTE.get(p)
+            if concepto is None:
+                continue
+            peso = PESO_JUICIO if concepto == "Días de Juicio" else 1.0
+            filas.append((i, concepto, peso))
+
+    return pd.DataFrame(filas, columns=["codigo", "concepto", "peso"])
+
+def calcular_resumen(df, festivos=FESTIVOS):
+    """
+    Resumen de todos los trabajadores de `df` (cuadrante aplicado, formato
+    largo). Devuelve un DataFrame con índice (nip, concepto) y columnas
+    1..12 (meses) con el número de días de cada concepto de
+    FILAS_CALCULADAS. Festivos trabajados y extras (F) usan la misma
+    regla: día festivo, sin contar los domingos (como los resúmenes
+    guardados).
+    """
+    columnas = list(range(1, 13))
+    if df.empty:
+        return pd.DataFrame(columns=columnas, index=pd.MultiIndex.from_tuples([], names=["nip", "concepto"]))
+
+    cod, codigos = pd.factorize(df["turno"])
+    fechas = pd.to_datetime(df["fecha"])
+    dias = fechas.dt.date
+
+    base = pd.DataFrame({
+        "nip": df["nip"].to_numpy(),
+        "mes": df["mes"].to_numpy(),
+        "codigo": cod,
+    })
+
+    es_festivo = dias.isin(list(festivos)).to_numpy()
+    es_finde = (fechas.dt.dayofweek >= 5).to_numpy()
+    laborable = ~(es_festivo | es_finde)
+
+    # Un día trabajado es el que cubre alguna franja
+    trabaja_codigo = np.array([bool(registro.cobertura(c)) for c in codigos], dtype=bool)
+    trabaja = np.zeros(len(df), dtype=bool)
+    trabaja[cod >= 0] = trabaja_codigo[cod[cod >= 0]]
+
+    # ---------- CONCEPTOS POR PARTE DEL TURNO ----------
+    largo = base.reset_index().merge(_conceptos_por_codigo(codigos), on="codigo")
+    largo = largo[laborable[largo["index"].to_numpy()] | ~largo["concepto"].isin(SOLO_LABORABLES).to_numpy()]
+    fila = largo["index"].to_numpy()
+
+    es_extra = largo["concepto"].isin(EXTRAS).to_numpy()
+    largo = largo.assign(concepto=np.where(
+        es_extra,
+        largo["concepto"] + np.where(es_festivo[fila], " (F)", " (N)"),
+        largo["concepto"]
+    ))
+
+    # ---------- FESTIVOS Y FINES DE SEMANA TRABAJADOS ----------
+    festivos_trab = base[trabaja & es_festivo].assign(concepto="Festivos trabajados", peso=1.0)
+    findes_trab = base[trabaja & es_finde].assign(concepto="Fines de semana trabajados", peso=0.5)
+
+    todo = pd.concat(
+        [largo[["nip", "mes", "concepto", "peso"]], festivos_trab, findes_trab],
+        ignore_index=True
+    )
+
+    resumen = (
+        todo
+        .groupby(["nip", "concepto", "mes"])["peso"].sum()
+        .unstack("mes")
+    )
+
+    nips = pd.unique(df["nip"])
+    return resumen.reindex(
+        index=pd.MultiIndex.from_product([nips, FILAS_CALCULADAS], names=["nip", "concepto"]),
+        columns=columnas,
+        fill_value=0
+    ).fillna(0)
+
+# ==================================================
+# CACHÉ POR VERSIÓN DEL HISTORIAL
+# ==================================================
+_cache_resumenes = OrderedDict()   # versiones de los meses -> (resumen, meses), LRU
+_lock = threading.Lock()
+
+def resumen_anual(meses, festivos=FESTIVOS):
+    """
+    Resumen del año a partir de sus meses, dados como (anio, mes,
+    ruta_csv, df_hist). Se recalcula sólo si cambia algún CSV o algún
+    historial. Devuelve (resumen, meses con datos).
+    """
+    clave = tuple(version_mes(df_hist, ruta) for _, _, ruta, df_hist in meses)
+
+    with _lock:
+        en_cache = _cache_resumenes.get(clave)
+        if en_cache is not None:
+            _cache_resumenes.move_to_end(clave)
+            return en_cache
+
+    partes = []
+    for anio, mes, ruta, df_hist in meses:
+        df, _ = cuadrante_aplicado(df_hist, ruta)
+        partes.append(df[(df["anio"] == anio) & (df["mes"] == mes)])
+
+    df_anio = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=["nip", "mes", "fecha", "turno"])
+    resultado = (calcular_resumen(df_anio, festivos), frozenset(m for _, m, _, _ in meses))
+
+    with _lock:
+        _cache_resumenes[clave] = resultado
+        while len(_cache_resumenes) > MAX_RESUMENES_EN_MEMORIA:
+            _cache_resumenes.popitem(last=False)
+
+    return resultado
+
+# ==================================================
+# TABLA PERSONAL (MISMO FORMATO QUE resumenes_csv/)
+# ==================================================
+def ruta_resumen(anio, nip, directorio=RESUMENES_DIR):
+    return os.path.join(directorio, str(anio), f"{nip}.csv")
+
+def _separador(texto):
+    return ";" if texto.count(";") > texto.count(",") else ","
+
+def _leer_filas(ruta):
+    with open(ruta, encoding="utf-8-sig") as f:
+        texto = f.read()
+    separador = _separador(texto)
+    return [linea.split(separador) for linea in texto.splitlines()]
+
+def resumen_guardado(ruta):
+    """
+    Filas de un resumen guardado por concepto ({concepto: celdas}, la
+    cabecera con la clave ""), o {} si no existe.
+    """
+    if not os.path.exists(ruta):
+        return {}
+    return {fila[0]: fila for fila in _leer_filas(ruta) if fila}
+
+def _cupos(guardado):
+    """Cupos anuales {concepto: cupo} de un resumen guardado ("21/54" -> 54)."""
+    cabecera = guardado.get("", [])
+    if "Total" not in cabecera:
+        return {}
+    col_total = cabecera.index("Total")
+
+    cupos = {}
+    for concepto, fila in guardado.items():
+        if len(fila) > col_total and "/" in fila[col_total]:
+            try:
+                cupos[concepto] = float(fila[col_total].split("/")[1])
+            except ValueError:
+                continue
+    return cupos
+
+def _numero(v):
+    v = float(v)
+    return str(int(v)) if v.is_integer() else f"{v:g}"
+
+def _valor(celda):
+    """Número de una celda ("2.5", o la parte usada de "21/54"), o None."""
+    try:
+        return float(celda.split("/")[0])
+    except ValueError:
+        return None
+
+def tabla_personal(resumen, meses_con_datos, nip, guardado=None, conservar=True):
+    """
+    Filas (listas de texto) del resumen de un trabajador: cabecera con los
+    meses y "Total", una fila por concepto. Los meses sin cuadrante quedan
+    vacíos y el total lleva "/cupo" si el concepto tiene cupo.
+
+    De `guardado` (resumen_guardado()) salen los cupos, las filas de
+    FILAS_GUARDADAS tal cual y las columnas que siguen a "Total" (como
+    "H. de baja"). Con `conservar`, los meses que el guardado ya tiene
+    rellenos se muestran como están y sólo se calculan los que le faltan;
+    el total guardado suma lo calculado.
+    """
+    guardado = guardado or {}
+    cupos = _cupos(guardado)
+    cabecera = [""] + MESES_RESUMEN + ["Total"]
+    filas = [cabecera + guardado.get("", [])[len(cabecera):]]
+
+    if nip not in resumen.index.get_level_values("nip"):
+        return filas
+
+    datos_nip = resumen.loc[nip]
+
+    for concepto in FILAS:
+        if concepto in FILAS_GUARDADAS:
+            if concepto in guardado:
+                filas.append(list(guardado[concepto]))
+            continue
+
+        valores = datos_nip.loc[concepto]
+        anterior = guardado.get(concepto, []) if conservar else []
+        fila = [concepto]
+        calculados = []
+        for m in range(1, 13):
+            if m < len(anterior) and anterior[m] != "":
+                fila.append(anterior[m])
+            elif m in meses_con_datos:
+                fila.append(_numero(valores[m]))
+                calculados.append(m)
+            else:
+                fila.append("")
+
+        previo = _valor(anterior[13]) if len(anterior) > 13 else None
+        if previo is not None and not calculados:
+            total = anterior[13]
+        else:
+            if previo is not None:
+                suma = previo + valores[calculados].sum()
+            else:
+                suma = sum(n for n in map(_valor, fila[1:]) if n is not None)
+            total = _numero(suma)
+            if concepto in cupos:
+                total = f"{total}/{_numero(cupos[concepto])}"
+        fila.append(total)
+
+        filas.append(fila + guardado.get(concepto, [])[len(fila):])
+
+    return filas
+
+def _mismo_valor(a, b):
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return a == b
+
+def diferencias(filas, guardado):
+    """
+    Lo que se perdería al sustituir el resumen guardado por `filas`:
+    [(concepto, mes, guardado, calculado)] con los meses ya rellenos que
+    no coinciden, y mes None para las filas que `filas` no tiene.
+    """
+    nuevas = {fila[0]: fila for fila in filas}
+    resultado = []
+    for concepto, anterior in guardado.items():
+        if concepto == "":
+            continue
+        fila = nuevas.get(concepto)
+        if fila is None:
+            resultado.append((concepto, None, ";".join(anterior[1:]), ""))
+            continue
+        for mes in range(1, min(13, len(anterior))):
+            calculado = fila[mes] if mes < len(fila) else ""
+            if anterior[mes] != "" and not _mismo_valor(anterior[mes], calculado):
+                resultado.append((concepto, mes, anterior[mes], calculado))
+    return resultado
+
+# ==================================================
+# MATERIALIZACIÓN EN resumenes_csv/ (LOTE)
+# ==================================================
+def materializar(resumen, meses_con_datos, anio, directorio=RESUMENES_DIR, sobrescribir=False):
+    """
+    Escribe un CSV por trabajador en <directorio>/<anio>/<nip>.csv.
+    Sin `sobrescribir` no toca los resúmenes que ya existen; con él sólo
+    reescribe los que coinciden con lo calculado en todos los meses que
+    ya tienen rellenos (diferencias()). Devuelve (rutas escritas,
+    {ruta: diferencias} de los que se han dejado como estaban).
+    """
+    carpeta = os.path.join(directorio, str(anio))
+    os.makedirs(carpeta, exist_ok=True)
+
+    escritas, distintas = [], {}
+    for nip in resumen.index.get_level_values("nip").unique():
+        ruta = ruta_resumen(anio, nip, directorio)
+        separador = ","
+        guardado = resumen_guardado(ruta)
+        if guardado:
+            if not sobrescribir:
+                continue
+            with open(ruta, encoding="utf-8-sig") as f:
+                separador = _separador(f.read())
+
+        calculadas = tabla_personal(resumen, meses_con_datos, nip, guardado, conservar=False)
+        cambios = diferencias(calculadas, guardado)
+        if cambios:
+            distintas[ruta] = cambios
+            continue
+
+        filas = tabla_personal(resumen, meses_con_datos, nip, guardado)
+
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+            csv.writer(f, delimiter=separador).writerows(filas)
+        os.replace(tmp, ruta)
+        escritas.append(ruta)
+
+    return escritas, distintas
+
+def meses_del_anio(anio, directorio=CUADRANTES_DIR):
+    """[(anio, mes, ruta_csv)] de los cuadrantes del año, en orden."""
+    meses = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, f"{anio}_*.csv"))):
+        try:
+            mes = int(os.path.basename(ruta)[5:7])
+        except ValueError:
+            continue
+        meses.append((anio, mes, ruta))
+    return meses
+
+def main():
+    import persistencia
+
+    parser = argparse.ArgumentParser(description="Genera resumenes_csv/AAAA/<nip>.csv desde el cuadrante y el historial.")
+    parser.add_argument("anio", type=int)
+    parser.add_argument("--sobrescribir", action="store_true", help="reescribe también los resúmenes existentes")
+    parser.add_argument("--directorio", default=RESUMENES_DIR)
+    args = parser.parse_args()
+
+    token = os.environ["GITHUB_TOKEN"]
+    meses = [
+        (anio, mes, ruta, persistencia.cargar_historial_mes(anio, mes, token))
+        for anio, mes, ruta in meses_del_anio(args.anio)
+    ]
+
+    resumen, meses_con_datos = resumen_anual(meses)
+    escritas, distintas = materializar(resumen, meses_con_datos, args.anio, args.directorio, args.sobrescribir)
+    print(f"{len(escritas)} resúmenes escritos en {args.directorio}/{args.anio}/")
+
+    for ruta, cambios in distintas.items():
+        print(f"{ruta}: no coincide con lo calculado, se deja como está")
+        for concepto, mes, anterior, calculado in cambios:
+            donde = "fila" if mes is None else MESES_RESUMEN[mes - 1]
+            print(f"    {concepto} ({donde}): {anterior!r} -> {calculado!r}")
+
+if __name__ == "__main__":
+    main()
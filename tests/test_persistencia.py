@@ -0,0 +1,130 @@
+"""
+Descarga condicional del historial (cargar_csv_desde_github) contra un
+servidor local que imita la API de contenidos de GitHub.
+"""
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import persistencia
+
+RUTA = "historial/2026_01.csv"
+
+CSV = (
+    "fecha_hora,usuario_admin,nip_afectado,nombre_afectado,fecha_turno,turno_anterior,turno_nuevo,observaciones\n"
+    "2026-01-02 10:00:00,ADMIN,032013,Ana,2026-01-05,1,2,\n"
+)
+
+class GitHubLocal:
+    """Sirve ficheros con ETag y 304; `estado` fuerza otra respuesta (p. ej. 500)."""
+
+    def __init__(self):
+        self.ficheros = {}
+        self.estado = None
+        self.peticiones = []    # (ruta, If-None-Match)
+
+        local = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, codigo, cuerpo=None, etag=None):
+                datos = b"" if cuerpo is None else json.dumps(cuerpo).encode()
+                self.send_response(codigo)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                ruta = self.path.split("/contents/", 1)[-1]
+                local.peticiones.append((ruta, self.headers.get("If-None-Match")))
+
+                if local.estado:
+                    return self._responder(local.estado, {"message": "error"})
+                if ruta not in local.ficheros:
+                    return self._responder(404, {"message": "Not Found"})
+
+                contenido = local.ficheros[ruta].encode()
+                etag = f'"{hashlib.sha1(contenido).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._responder(304, etag=etag)
+                self._responder(200, {"content": base64.b64encode(contenido).decode()}, etag)
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+@pytest.fixture
+def github(monkeypatch):
+    local = GitHubLocal()
+    anterior = persistencia.cliente
+    persistencia.usar_cliente(persistencia.ClienteGitHub(api=local.url, timeout=(1, 2), reintentos=0))
+    monkeypatch.setattr(persistencia, "_cache_descargas", {})
+    yield local
+    persistencia.usar_cliente(anterior)
+    local.parar()
+
+def cargar():
+    return persistencia.cargar_csv_desde_github(RUTA, "token", dtype=persistencia.TIPOS_HISTORIAL)
+
+def test_304_reutiliza_el_mismo_dataframe(github):
+    github.ficheros[RUTA] = CSV
+
+    primero = cargar()
+    segundo = cargar()
+
+    assert segundo is primero
+    assert primero["nip_afectado"].tolist() == ["032013"]
+    assert github.peticiones[0][1] is None
+    assert github.peticiones[1][1] is not None    # If-None-Match con el ETag
+
+def test_fichero_cambiado_se_vuelve_a_descargar(github):
+    github.ficheros[RUTA] = CSV
+    primero = cargar()
+
+    github.ficheros[RUTA] = CSV + "2026-01-03 11:00:00,ADMIN,032014,Eva,2026-01-06,3,L,\n"
+    segundo = cargar()
+
+    assert segundo is not primero
+    assert len(segundo) == 2
+
+def test_refresco_min_no_pregunta_a_github(github):
+    github.ficheros[RUTA] = CSV
+    primero = persistencia.cargar_csv_desde_github(RUTA, "token", refresco_min=60)
+    segundo = persistencia.cargar_csv_desde_github(RUTA, "token", refresco_min=60)
+
+    assert segundo is primero
+    assert len(github.peticiones) == 1
+
+def test_error_de_github_usa_la_ultima_copia_buena(github):
+    github.ficheros[RUTA] = CSV
+    primero = cargar()
+
+    github.estado = 500
+    assert cargar() is primero
+
+def test_sin_conexion_usa_la_ultima_copia_buena(github):
+    github.ficheros[RUTA] = CSV
+    primero = cargar()
+
+    github.parar()
+    assert cargar() is primero
+
+def test_error_sin_copia_previa_lanza_error(github):
+    github.estado = 500
+    with pytest.raises(persistencia.ErrorGitHub):
+        cargar()
+
+def test_fichero_inexistente_devuelve_none(github):
+    assert cargar() is None
@@ -0,0 +1,118 @@
+"""
+Resumen anual: reglas de conteo y materialización sobre los resúmenes
+guardados en resumenes_csv/, que se mantienen a mano.
+"""
+import os
+import shutil
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import resumen
+
+GUARDADOS = os.path.join(os.path.dirname(__file__), os.pardir, resumen.RESUMENES_DIR)
+NIPS = ("032013", "032025")
+
+def cuadrante(nip, turnos):
+    """Formato largo mínimo a partir de {fecha: turno}."""
+    fechas = sorted(turnos)
+    return pd.DataFrame({
+        "nip": nip,
+        "mes": [f.month for f in fechas],
+        "fecha": pd.to_datetime(fechas),
+        "turno": [turnos[f] for f in fechas],
+    })
+
+def resumen_de_archivo(guardado, nip):
+    """Un resumen calculado que reproduce los meses rellenos del guardado."""
+    valores = {
+        (nip, concepto): [float(x) if x else 0.0 for x in guardado[concepto][1:13]]
+        for concepto in resumen.FILAS_CALCULADAS
+    }
+    return pd.DataFrame.from_dict(valores, orient="index", columns=range(1, 13)).set_axis(
+        pd.MultiIndex.from_tuples(valores, names=["nip", "concepto"])
+    )
+
+@pytest.fixture
+def directorio(tmp_path):
+    shutil.copytree(os.path.join(GUARDADOS, "2026"), tmp_path / "2026")
+    return str(tmp_path)
+
+def test_vacaciones_cuentan_dias_laborables():
+    # Lunes 5 a domingo 11 de enero de 2026; el 6 es festivo
+    turnos = {date(2026, 1, d): "Vac" for d in range(5, 12)}
+    res = resumen.calcular_resumen(cuadrante("1", turnos))
+
+    assert res.loc[("1", "Vacaciones"), 1] == 4
+
+def test_festivos_y_extras_usan_la_misma_regla():
+    turnos = {
+        date(2026, 1, 4): "1ex",     # domingo, no festivo
+        date(2026, 1, 6): "2ex",     # festivo
+        date(2026, 1, 7): "3ex",     # miércoles
+    }
+    res = resumen.calcular_resumen(cuadrante("1", turnos)).loc["1", 1]
+
+    festivas = sum(res[f"{e} (F)"] for e in resumen.EXTRAS)
+    assert festivas == res["Festivos trabajados"] == 1
+    assert res["1ex (N)"] == res["3ex (N)"] == 1
+
+def test_juicio_cuenta_medio_dia():
+    turnos = {date(2026, 1, 19): "JuB", date(2026, 1, 20): "1yJuC"}
+    res = resumen.calcular_resumen(cuadrante("1", turnos)).loc["1", 1]
+
+    assert res["Días de Juicio"] == 1
+    assert res["Mañanas"] == 1
+
+@pytest.mark.parametrize("nip", NIPS)
+def test_tabla_conserva_filas_y_columnas_guardadas(nip):
+    guardado = resumen.resumen_guardado(resumen.ruta_resumen(2026, nip, GUARDADOS))
+    res = resumen.calcular_resumen(cuadrante(nip, {date(2026, 1, 5): "1"}))
+
+    filas = resumen.tabla_personal(res, {1}, nip, guardado)
+
+    assert [f[0] for f in filas] == list(guardado)
+    for concepto in resumen.FILAS_GUARDADAS:
+        assert filas[[f[0] for f in filas].index(concepto)] == guardado[concepto]
+    assert {f[14] for f in filas if len(f) > 14} == {f[14] for f in guardado.values() if len(f) > 14}
+
+@pytest.mark.parametrize("nip", NIPS)
+def test_tabla_muestra_lo_guardado_y_calcula_lo_que_falta(nip):
+    guardado = resumen.resumen_guardado(resumen.ruta_resumen(2026, nip, GUARDADOS))
+    res = resumen.calcular_resumen(cuadrante(nip, {date(2026, 1, 5): "1", date(2026, 8, 3): "1"}))
+
+    filas = resumen.tabla_personal(res, set(range(1, 9)), nip, guardado)
+    mananas = filas[[f[0] for f in filas].index("Mañanas")]
+
+    assert resumen.diferencias(filas, guardado) == []
+    assert mananas[8] == "1"
+    assert float(mananas[13]) == float(guardado["Mañanas"][13]) + 1
+    assert resumen.diferencias(resumen.tabla_personal(res, {1}, nip, guardado, conservar=False), guardado)
+
+def test_materializar_no_pisa_resumenes_que_no_coinciden(directorio):
+    rutas = [resumen.ruta_resumen(2026, nip, directorio) for nip in NIPS]
+    antes = [open(r, "rb").read() for r in rutas]
+
+    df = pd.concat([cuadrante(nip, {date(2026, 1, 5): "1"}) for nip in NIPS])
+    escritas, distintas = resumen.materializar(
+        resumen.calcular_resumen(df), {1}, 2026, directorio, sobrescribir=True
+    )
+
+    assert escritas == []
+    assert set(distintas) == set(rutas)
+    assert [open(r, "rb").read() for r in rutas] == antes
+
+def test_materializar_reescribe_si_coincide(directorio):
+    nip = "032013"
+    ruta = resumen.ruta_resumen(2026, nip, directorio)
+    guardado = resumen.resumen_guardado(ruta)
+
+    escritas, distintas = resumen.materializar(
+        resumen_de_archivo(guardado, nip), set(range(1, 8)), 2026, directorio, sobrescribir=True
+    )
+
+    assert escritas == [ruta] and distintas == {}
+    nuevo = resumen.resumen_guardado(ruta)
+    assert resumen.diferencias(list(nuevo.values()), guardado) == []
+    assert all(nuevo[c] == guardado[c] for c in resumen.FILAS_GUARDADAS)
@@ -0,0 +1,308 @@
+"""
+Registro de códigos de turno.
+
+Toda la semántica de un código (partes, nombre, estilo, franjas que
+cubre) se calcula una sola vez por código distinto, incluidos los
+compuestos con "y" (doble turno), "|" (turno + extra) y "ex" (extra).
+Las vistas sólo hacen consultas O(1) al registro y los conteos se hacen
+sobre matrices booleanas en lugar de recorrer celda a celda.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+FRANJAS = ("1", "2", "3")
+
+# ==================================================
+# NOMBRES DE TURNOS
+# ==================================================
+NOMBRES_TURNO = {
+    "1": "Mañana", "2": "Tarde", "3": "Noche", "L": "Laborable",
+    "1ex": "Mañana extra", "2ex": "Tarde extra", "3ex": "Noche extra",
+    "D": "Descanso", "Dc": "Descanso compensado",
+    "Dcv": "Desc. comp. verano", "Dcc": "Desc. comp. curso",
+    "Dct": "Desc. comp. tiro", "Dcj": "Desc. comp. juicio",
+    "Vac": "Vacaciones", "perm": "Permiso", "BAJA": "Baja",
+    "Ts": "Tiempo sindical", "AP": "Asuntos particulares",
+    "JuB": "Juicio Betanzos", "JuC": "Juicio Coruña",
+    "curso": "curso", "indisp": "Indisposición", "EV": "Educación Vial",
+    "Tir": "Tiro", "AGASP": "AGASP", "CU": "Cuadrante", "Dcu": "Desc. comp. cuad." 
+}
+
+# ==================================================
+# TURNOS QUE SE PUEDEN ASIGNAR DESDE EL PANEL ADMIN
+# ==================================================
+TURNOS_EDITABLES = [
+    "1", "2", "3", "L",
+    "1ex", "2ex", "3ex",
+    "D", "Dc", "Dcv", "Dcc", "Dct", "Dcj",
+    "Vac", "BAJA", "perm", "Ts", "AP",
+    "JuB", "JuC", "curso", "indisp",
+    "1y2", "1y3", "2y3",
+    "1y2ex", "1y3ex", "2y3ex",
+    "1|2ex", "1|3ex", "2|1ex", "2|3ex", "3|1ex", "3|2ex", "L|2ex", "L|3ex",
+    "1yJuB", "LyJuB", "AP|1ex", "AP|2ex", "AP|3ex", "3yJuC", "EV", "Tir",
+    "1ycurso", "2ycurso", "3ycurso", "Tir|2ex", "Tir|3ex", "2yJuC"
+]
+
+# ==================================================
+# ESTILOS DE TURNOS
+# ==================================================
+COLORES_TURNO = {
+    "1": ("#BDD7EE", "#0070C0"),
+    "L": ("#BDD7EE", "#0070C0"),
+    "2": ("#FFE699", "#0070C0"),
+    "3": ("#F8CBAD", "#FF0000"),
+    "1ex": ("#00B050", "#FF0000"),
+    "2ex": ("#00B050", "#FF0000"),
+    "3ex": ("#00B050", "#FF0000"),
+    "D": ("#C6E0B4", "#00B050"),
+    "Dc": ("#C6E0B4", "#00B050"),
+    "Dcv": ("#C6E0B4", "#00B050"),
+    "Dcu": ("#C6E0B4", "#00B050"),
+    "Dcc": ("#C6E0B4", "#00B050"),
+    "Dct": ("#C6E0B4", "#00B050"),
+    "Dcj": ("#C6E0B4", "#00B050"),
+    "Vac": ("#FFFFFF", "#FF0000"),
+    "perm": ("#FFFFFF", "#FF0000"),
+    "indisp": ("#FFFFFF", "#FF0000"),
+    "EV": ("#FFFFFF", "#FF0000"),
+    "curso": ("#FFFFFF", "#FF0000"),
+    "BAJA": ("#FFFFFF", "#FF0000"),
+    "Ts": ("#FFFFFF", "#FF0000"),
+    "Tir": ("#FFFFFF", "#FF0000"),
+    "CU": ("#FFFFFF", "#FF0000"),
+    "indisp": ("#FFFFFF", "#FF0000"),
+    "JuB": ("#FFFFFF", "#FF0000"),
+    "JuC": ("#FFFFFF", "#FF0000"),
+    "1yJuB": ("#BDD7EE", "#FF0000"),
+    "LyJuB": ("#BDD7EE", "#FF0000"),
+    "3yJuC": ("#BDD7EE", "#FF0000"),
+    "2yJuC": ("#BDD7EE", "#FF0000"),
+    "AP": ("#FFFFFF", "#0070C0"),
+    "AGASP": ("#FFFFFF", "#0070C0"),
+    "1y2ex": ("#00B050", "#FF0000"),
+    "2y3ex": ("#00B050", "#FF0000"),
+    "1y3ex": ("#00B050", "#FF0000"),
+    "1|2ex": ("#00B050", "#FF0000"),
+    "1|3ex": ("#00B050", "#FF0000"),
+    "2|1ex": ("#00B050", "#FF0000"),
+    "2|3ex": ("#00B050", "#FF0000"),
+    "3|1ex": ("#00B050", "#FF0000"),
+    "3|2ex": ("#00B050", "#FF0000"),
+    "AP|1ex": ("#00B050", "#FF0000"),
+    "AP|2ex": ("#00B050", "#FF0000"),
+    "AP|3ex": ("#00B050", "#FF0000"),
+}
+
+ESTILO_VACIO = {"bg": "#FFFFFF", "fg": "#000000", "bold": False, "italic": False}
+
+# Turnos dobles normales
+DOBLES = {"1y2", "1y3", "2y3", "3yJuC", "2yJuC", "1yJuB", "LyJuB", "1ycurso", "2ycurso", "3ycurso"}
+
+EN_NEGRITA = {
+    "perm", "Ts", "JuB", "JuC", "AP", "AGASP", "Vac", "BAJA", "indisp", "curso",
+    "1yJuB", "3yJuC", "2yJuC", "EV", "Tir", "CU",
+    "1y2", "1y3", "2y3", "1ycurso", "2ycurso", "3ycurso"
+}
+
+EN_CURSIVA = {"Vac", "BAJA"}
+
+# ==================================================
+# FRANJAS
+# ==================================================
+# Códigos que NO cuentan para la cobertura del cuadrante general
+NO_CUENTAN_COBERTURA = ["D", "Vac", "BAJA", "perm", "Ts", "Dc", "Dct", "Dcc", "Dcv", "curso", "indisp"]
+
+# Para buscar compañeros además se descartan AP y juicios
+NO_CUENTAN_COMPAÑEROS = NO_CUENTAN_COBERTURA + ["AP", "JuB", "JuC"]
+
+def _franjas(t, no_cuentan):
+    if any(x in t for x in no_cuentan):
+        return frozenset()
+    return frozenset(f for f in FRANJAS if f in t)
+
+def _estilo(t):
+    if t in DOBLES:
+        return {"bg": "#DBDBDB", "fg": "#FF0000", "bold": True, "italic": False}
+
+    # Turnos dobles con extra
+    if "ex" in t and ("y" in t or "|" in t):
+        return {"bg": "#00B050", "fg": "#FF0000", "bold": True, "italic": False}
+
+    bg, fg = COLORES_TURNO.get(t, ("#FFFFFF", "#000000"))
+
+    return {
+        "bg": bg,
+        "fg": fg,
+        "bold": t in EN_NEGRITA or "ex" in t,   # cualquier extra en negrita
+        "italic": t in EN_CURSIVA
+    }
+
+def _clave_estilo(e):
+    return (e["bg"], e["fg"], bool(e.get("bold")), bool(e.get("italic")))
+
+def _partes(t):
+    if "y" in t:
+        return tuple(t.split("y"))
+    if "|" in t:
+        return tuple(t.split("|"))
+    return (t,)
+
+# ==================================================
+# REGISTRO
+# ==================================================
+Turno = namedtuple("Turno", [
+    "codigo",      # texto del código
+    "partes",      # ("1", "2ex") para "1|2ex"
+    "extra",       # alguna parte es un extra
+    "nombre",      # nombre legible
+    "estilo",      # {"bg", "fg", "bold", "italic"}
+    "franjas",     # franjas para buscar compañeros
+    "cobertura",   # franjas para los conteos Mañanas/Tardes/Noches
+    "conocido",    # el código (o todas sus partes) está en las tablas
+    "clase",       # clase CSS compartida por todos los códigos con el mismo estilo
+])
+
+TURNO_VACIO = Turno("", (), False, "", ESTILO_VACIO, frozenset(), frozenset(), True, "t0")
+
+CONOCIDOS = set(NOMBRES_TURNO) | set(COLORES_TURNO) | set(TURNOS_EDITABLES) | DOBLES
+
+class RegistroTurnos:
+    """
+    Caché código -> Turno. Los códigos desconocidos se avisan una sola
+    vez (en el log) la primera vez que aparecen.
+    """
+
+    def __init__(self):
+        self._turnos = {}
+        self._avisados = set()
+        self._clases = {_clave_estilo(ESTILO_VACIO): TURNO_VACIO.clase}
+        self._lock = threading.Lock()
+
+    def _clase(self, estilo):
+        clave = _clave_estilo(estilo)
+        clase = self._clases.get(clave)
+        if clase is None:
+            clase = self._clases[clave] = f"t{len(self._clases)}"
+        return clase
+
+    def _compilar(self, codigo):
+        t = str(codigo)
+        partes = _partes(t)
+        estilo = _estilo(t)
+
+        return Turno(
+            codigo=t,
+            partes=partes,
+            extra=any(p.endswith("ex") for p in partes),
+            nombre=NOMBRES_TURNO.get(t, t),
+            estilo=estilo,
+            franjas=_franjas(t, NO_CUENTAN_COMPAÑEROS),
+            cobertura=_franjas(t, NO_CUENTAN_COBERTURA),
+            conocido=t in CONOCIDOS or all(p in CONOCIDOS for p in partes),
+            clase=self._clase(estilo),
+        )
+
+    def info(self, codigo):
+        if pd.isna(codigo):
+            return TURNO_VACIO
+        turno = self._turnos.get(codigo)
+        if turno is None:
+            # Las sesiones de Streamlit corren en hilos distintos
+            with self._lock:
+                turno = self._turnos.get(codigo)
+                if turno is None:
+                    turno = self._turnos[codigo] = self._compilar(codigo)
+        return turno
+
+    # ---------- ATAJOS ----------
+    def estilo(self, codigo):
+        return self.info(codigo).estilo
+
+    def nombre(self, codigo):
+        return self.info(codigo).nombre
+
+    def partes(self, codigo):
+        return self.info(codigo).partes
+
+    def franjas(self, codigo):
+        return self.info(codigo).franjas
+
+    def cobertura(self, codigo):
+        return self.info(codigo).cobertura
+
+    def clase(self, codigo):
+        return self.info(codigo).clase
+
+    # ---------- CSS ----------
+    def css(self, clases=None):
+        """
+        Reglas `td.tN{...}` de las clases de estilo (todas o sólo `clases`).
+        """
+        reglas = []
+        for (bg, fg, bold, italic), clase in list(self._clases.items()):
+            if clases is not None and clase not in clases:
+                continue
+            reglas.append(
+                f"td.{clase}{{background:{bg};color:{fg};"
+                f"font-weight:{'bold' if bold else 'normal'};"
+                f"font-style:{'italic' if italic else 'normal'}}}"
+            )
+        return "\n".join(reglas)
+
+    # ---------- VALIDACIÓN ----------
+    def validar(self, codigos):
+        """Devuelve los códigos desconocidos; cada uno se avisa una sola vez."""
+        desconocidos = {
+            self.info(c).codigo for c in pd.unique(pd.Series(list(codigos), dtype=object))
+            if not pd.isna(c) and not self.info(c).conocido
+        }
+        for c in sorted(desconocidos - self._avisados):
+            log.warning("Código de turno desconocido: %r", c)
+        self._avisados |= desconocidos
+        return desconocidos
+
+registro = RegistroTurnos()
+
+# ==================================================
+# COBERTURA
+# ==================================================
+def tabla_franjas(codigos):
+    """
+    Tabla de consulta código -> franjas: DataFrame indexado por código con
+    una columna booleana por franja.
+    """
+    codigos = [c for c in pd.unique(pd.Series(list(codigos), dtype=object)) if not pd.isna(c)]
+    return pd.DataFrame(
+        {f: [f in registro.cobertura(c) for c in codigos] for f in FRANJAS},
+        index=pd.Index(codigos, dtype=object),
+        dtype=bool
+    )
+
+def cobertura_diaria(tabla):
+    """
+    Conteo de personas por franja y día a partir del cuadrante en forma
+    trabajador × día. Devuelve un DataFrame con filas "1", "2", "3" y las
+    mismas columnas que `tabla`.
+    """
+    lookup = tabla_franjas(tabla.to_numpy().ravel())
+
+    return pd.DataFrame(
+        {f: tabla.isin(lookup.index[lookup[f]]).sum(axis=0) for f in FRANJAS}
+    ).T.reindex(columns=tabla.columns)
+
+def cobertura(df, por="fecha", columna_turno="turno"):
+    """
+    Misma cobertura sobre el cuadrante en formato largo (una fila por
+    trabajador y día), agrupada por la columna `por`.
+    """
+    lookup = tabla_franjas(df[columna_turno])
+    marcas = lookup.reindex(df[columna_turno].to_numpy(), fill_value=False)
+    marcas.index = df.index
+
+    return marcas.groupby(df[por]).sum().astype(int)
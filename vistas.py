@@ -0,0 +1,442 @@
+"""
+Generación del HTML de las vistas del cuadrante.
+
+Las celdas no llevan estilos en línea: cada código usa la clase CSS de su
+estilo (ver turnos.RegistroTurnos.css) y sólo se emiten las reglas de las
+clases que aparecen en la tabla. Las filas se construyen con listas y
+"".join en lugar de concatenar cadenas.
+
+El HTML del cuadrante general es el mismo para todos los usuarios, así
+que se guarda en una caché compartida entre sesiones (LRU) con clave
+(año, mes, modo móvil, versión del historial). Lo que cambia por usuario
+(fila resaltada, día de hoy, zoom) se añade con unas pocas reglas CSS
+:nth-child sin tocar el HTML cacheado.
+
+La vista previa de libros Excel sigue la misma idea: una clase por
+estilo del libro, leyendo la hoja fila a fila y por páginas.
+"""
+import calendar
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from html import escape
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from datos import compañeros
+from turnos import registro, cobertura_diaria
+
+log = logging.getLogger(__name__)
+
+# ==================================================
+# CSS COMÚN DEL CUADRANTE GENERAL
+# ==================================================
+CSS_CUADRANTE = """
+.wrapper {
+    transform-origin: top left;
+    width: fit-content;
+}
+
+table.cuadrante-general {
+    border-collapse: collapse;
+    font-size: 16px;
+}
+
+.cuadrante-general th, .cuadrante-general td {
+    border: 1px solid #000;
+    padding: 6px;
+    text-align: center;
+    white-space: nowrap;
+}
+
+.cuadrante-general td {
+    font-weight: 600;
+}
+
+/* CABECERA FIJA */
+.cuadrante-general thead th {
+    position: sticky;
+    top: 0;
+    z-index: 10;
+    background: #111;
+    color: white;
+}
+
+/* FESTIVOS Y DOMINGOS */
+.cuadrante-general thead th.fes {
+    background: #92D050;
+    color: #FF0000;
+}
+
+/* CONTEOS MAÑANAS / TARDES / NOCHES */
+td.r1, td.r2, td.r3 {
+    color: #000;
+    font-weight: bold;
+}
+td.r1 { background: #BDD7EE; }
+td.r2 { background: #FFE699; }
+td.r3 { background: #F8CBAD; }
+"""
+
+FILAS_RESUMEN = (("1", "Mañanas"), ("2", "Tardes"), ("3", "Noches"))
+
+# Cuadrantes renderizados que se guardan a la vez
+MAX_CUADRANTES_EN_CACHE = 24
+
+_cache_cuadrantes = OrderedDict()   # (anio, mes, modo_movil, version) -> entrada, LRU
+_lock = threading.Lock()
+
+# ==================================================
+# CUADRANTE GENERAL
+# ==================================================
+def tabla_cuadrante(df_mes, modo_movil):
+    """
+    Pivot trabajador × día del mes, en el orden del CSV. Las celdas son
+    objetos, no categorías: isin() y to_numpy() (conteos y HTML) son
+    mucho más lentos sobre columnas categóricas.
+    """
+    if modo_movil:
+        index_cols = ["nip"]
+        orden = df_mes["nip"].drop_duplicates()
+    else:
+        index_cols = ["nombre", "categoria", "nip"]
+        orden = df_mes[index_cols].drop_duplicates()
+
+    return (
+        df_mes
+        .pivot_table(
+            index=index_cols,
+            columns="dia",
+            values="turno",
+            aggfunc="first",
+            observed=True
+        )
+        .reindex(orden)
+        .astype(object)
+    )
+
+def html_cuadrante(tabla, anio, mes, modo_movil, es_festivo=None):
+    """
+    HTML de la tabla del cuadrante general (trabajador × día) con las filas
+    de conteo por franja al final. No depende del usuario.
+
+    `tabla` es el pivot del mes: índice nip (modo móvil) o
+    (nombre, categoría, nip) y una columna por día.
+    """
+    clases_usadas = set()
+
+    # ---------- CABECERA ----------
+    cabecera = ["<th>NIP</th>"] if modo_movil else [
+        "<th>Nombre y apellidos</th><th>Categoría</th><th>NIP</th>"
+    ]
+
+    for d in tabla.columns:
+        fecha = date(anio, mes, d)
+        if (es_festivo and es_festivo(fecha)) or fecha.weekday() == 6:
+            cabecera.append(f"<th class='fes'>{d}</th>")
+        else:
+            cabecera.append(f"<th>{d}</th>")
+
+    # ---------- FILAS DEL CUADRANTE ----------
+    filas = []
+    for idx, valores in zip(tabla.index, tabla.to_numpy()):
+        if modo_movil:
+            partes = [f"<tr><td>{idx}</td>"]
+        else:
+            nombre, cat, nip = idx
+            partes = [f"<tr><td>{nombre}</td><td>{cat}</td><td>{nip}</td>"]
+
+        for v in valores:
+            turno = registro.info(v)
+            clases_usadas.add(turno.clase)
+            partes.append(f"<td class='{turno.clase}'>{turno.codigo}</td>")
+
+        partes.append("</tr>")
+        filas.append("".join(partes))
+
+    # ---------- CONTEO 1 / 2 / 3 ----------
+    conteos = cobertura_diaria(tabla)
+    colspan = "1" if modo_movil else "3"
+
+    for franja, titulo in FILAS_RESUMEN:
+        clase = f"r{franja}"
+        filas.append(
+            f"<tr><td colspan='{colspan}' class='{clase}'>{titulo}</td>"
+            + "".join(f"<td class='{clase}'>{v}</td>" for v in conteos.loc[franja].tolist())
+            + "</tr>"
+        )
+
+    html = "".join([
+        "<style>",
+        CSS_CUADRANTE,
+        registro.css(clases_usadas),
+        "</style>",
+        "<table class='cuadrante-general'><thead><tr>", "".join(cabecera), "</tr></thead>",
+        "<tbody>", "".join(filas), "</tbody></table>",
+    ])
+
+    log.debug("Cuadrante %d-%02d: %d bytes de HTML", anio, mes, len(html.encode("utf-8")))
+    return html
+
+def cuadrante_general(df_mes, anio, mes, modo_movil, version=None, es_festivo=None):
+    """
+    Cuadrante general renderizado, compartido entre sesiones.
+
+    Devuelve un dict con el HTML de la tabla y las posiciones de las filas
+    (por nip) y columnas (por día) para resaltar con CSS. Con version=None
+    (p. ej. vista previa con cambios sin guardar) no se usa la caché.
+    """
+    clave = (anio, mes, modo_movil, version)
+
+    if version is not None:
+        with _lock:
+            entrada = _cache_cuadrantes.get(clave)
+            if entrada is not None:
+                _cache_cuadrantes.move_to_end(clave)
+                return entrada
+
+    tabla = tabla_cuadrante(df_mes, modo_movil)
+    nips = tabla.index if modo_movil else tabla.index.get_level_values("nip")
+
+    filas = {}
+    for pos, nip in enumerate(nips, start=1):
+        filas.setdefault(str(nip), []).append(pos)
+
+    # Columnas fijas antes de los días: NIP o nombre, categoría y NIP
+    fijas = 1 if modo_movil else 3
+
+    entrada = {
+        "html": html_cuadrante(tabla, anio, mes, modo_movil, es_festivo),
+        "filas": filas,
+        "columnas": {d: fijas + pos for pos, d in enumerate(tabla.columns, start=1)},
+    }
+
+    if version is not None:
+        with _lock:
+            # Una versión nueva del historial deja obsoletas las anteriores del mes
+            for k in [k for k in _cache_cuadrantes if k[:3] == clave[:3]]:
+                del _cache_cuadrantes[k]
+            _cache_cuadrantes[clave] = entrada
+            while len(_cache_cuadrantes) > MAX_CUADRANTES_EN_CACHE:
+                _cache_cuadrantes.popitem(last=False)
+
+    return entrada
+
+def html_cuadrante_usuario(entrada, nip_usuario, dia_hoy=None, zoom=1.0):
+    """
+    Añade al cuadrante cacheado lo propio de cada usuario: su fila
+    resaltada, la columna del día de hoy y el zoom.
+    """
+    reglas = []
+
+    for pos in entrada["filas"].get(nip_usuario, []):
+        fila = f".cuadrante-general tbody tr:nth-child({pos})"
+        reglas.append(
+            f"{fila} td{{border-top:3px solid #000 !important;border-bottom:3px solid #000 !important}}"
+            f"{fila} td:first-child{{border-left:3px solid #000 !important}}"
+            f"{fila} td:last-child{{border-right:3px solid #000 !important}}"
+        )
+
+    col = entrada["columnas"].get(dia_hoy)
+    if col is not None:
+        reglas.append(
+            f".cuadrante-general thead th:nth-child({col}){{background:#00B0F0 !important;color:#000 !important;font-weight:bold}}"
+        )
+
+    return "".join([
+        f"<style>{''.join(reglas)}</style>" if reglas else "",
+        "<div style='overflow:auto; max-height:75vh'>",
+        f"<div class='wrapper' style='transform:scale({zoom})'>",
+        entrada["html"],
+        "</div></div>",
+    ])
+
+# ==================================================
+# CALENDARIO "MIS TURNOS"
+# ==================================================
+CSS_CALENDARIO = """
+.cal {
+    display: grid;
+    grid-template-columns: repeat(7, minmax(0, 1fr));
+    column-gap: 1rem;
+    row-gap: 25px;
+}
+.cal .dia {
+    border: 1px solid #999;
+    text-align: center;
+    padding: 4px;
+}
+.cal .hoy {
+    background: #00B0F0;
+    color: #000;
+}
+.cal .parte {
+    text-align: center;
+}
+/* En pantallas estrechas, un día por fila (como st.columns) */
+@media (max-width: 640px) {
+    .cal { grid-template-columns: 1fr; row-gap: 1rem; }
+    .cal .vacio { display: none; }
+}
+"""
+
+def html_calendario(anio, mes, turnos_dia, indice, nip_usuario, dia_hoy=None):
+    """
+    Calendario del mes como un único bloque HTML (rejilla CSS de 7
+    columnas). `turnos_dia` es {date: turno} del usuario e `indice` el de
+    datos.indice_compañeros().
+    """
+    celdas = []
+
+    for d in calendar.Calendar().itermonthdates(anio, mes):
+        if d.month != mes:
+            celdas.append("<div class='vacio'></div>")
+            continue
+
+        partes = ["<div class='dia hoy'>" if dia_hoy == d.day else "<div class='dia'>", f"<b>{d.day}</b><br>"]
+
+        turno_dia = turnos_dia.get(d)
+        if turno_dia is not None:
+            fecha = pd.Timestamp(d)
+            for p in registro.partes(str(turno_dia)):
+                e = registro.estilo(p)
+                partes.append(
+                    f"<div class='parte' style='background:{e['bg']};color:{e['fg']}'>"
+                    f"<b>{registro.nombre(p)}</b><br>"
+                )
+                partes.extend(f"{c}<br>" for c in compañeros(indice, fecha, p, nip_usuario))
+                partes.append("</div>")
+
+        partes.append("</div>")
+        celdas.append("".join(partes))
+
+    return "".join(["<style>", CSS_CALENDARIO, "</style>", "<div class='cal'>", "".join(celdas), "</div>"])
+
+def tamano_html(html):
+    """Tamaño en KB (UTF-8) de un bloque HTML, para mostrarlo en la app."""
+    return len(html.encode("utf-8")) / 1024
+
+# ==================================================
+# VISTA PREVIA DE UN LIBRO EXCEL
+# ==================================================
+CSS_EXCEL = """
+table.xl {
+    border-collapse: collapse;
+}
+table.xl td {
+    border: 1px solid #000;
+    padding: 4px;
+}
+"""
+
+# Filas por página de la vista previa
+FILAS_VISTA_PREVIA = 100
+
+# Alineaciones de Excel que no existen en CSS
+_ALINEACION_CSS = {"centerContinuous": "center", "distributed": "justify", "general": None, "fill": None}
+
+def _color_excel(color):
+    """#RRGGBB de un color de openpyxl; None si es de tema o indexado."""
+    rgb = getattr(color, "rgb", None)
+    return f"#{rgb[-6:]}" if isinstance(rgb, str) else None
+
+def _css_celda(celda):
+    """Reglas CSS del estilo de una celda (fondo, letra y alineación)."""
+    reglas = []
+
+    fill = celda.fill
+    if fill is not None and fill.fill_type == "solid":
+        bg = _color_excel(fill.fgColor)
+        if bg:
+            reglas.append(f"background:{bg}")
+
+    font = celda.font
+    if font is not None:
+        if font.b:
+            reglas.append("font-weight:bold")
+        fg = _color_excel(font.color)
+        if fg:
+            reglas.append(f"color:{fg}")
+
+    alignment = celda.alignment
+    if alignment is not None and alignment.horizontal:
+        horizontal = _ALINEACION_CSS.get(alignment.horizontal, alignment.horizontal)
+        if horizontal:
+            reglas.append(f"text-align:{horizontal}")
+
+    return ";".join(reglas)
+
+def _texto_excel(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    elif isinstance(valor, datetime) and valor.time() == time():
+        valor = valor.date()
+    return escape(str(valor))
+
+def hojas_excel(origen):
+    """{nombre de hoja: número de filas} de un libro (ruta o fichero binario)."""
+    libro = load_workbook(origen, read_only=True)
+    try:
+        # Sin dimensiones guardadas en el libro hay que contar las filas
+        return {
+            hoja.title: hoja.max_row or sum(1 for _ in hoja.iter_rows(values_only=True))
+            for hoja in libro.worksheets
+        }
+    finally:
+        libro.close()
+
+def excel_a_html(origen, hoja=None, desde=0, max_filas=None):
+    """
+    HTML de una hoja de un libro Excel (ruta o fichero binario) con el
+    fondo, el color y la negrita de la letra y la alineación de cada celda.
+
+    El libro se abre en modo read_only y se recorre fila a fila, sin
+    cargarlo entero. El CSS se calcula una vez por estilo del libro (style
+    id) y las celdas llevan la clase de su estilo. Sin `hoja`, la hoja
+    activa del libro. `desde` (0 = primera fila) y `max_filas` (None =
+    hasta el final) paginan la hoja.
+    """
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        ws = libro[hoja] if hoja else libro.active
+        hasta = desde + max_filas if max_filas is not None else None
+
+        clases = {}     # style id -> clase CSS ("" si no tiene estilo)
+        por_css = {}    # reglas -> clase (estilos distintos con el mismo CSS)
+        reglas = []
+        filas = []
+
+        for fila in ws.iter_rows(min_row=desde + 1, max_row=hasta):
+            partes = ["<tr>"]
+
+            for celda in fila:
+                style_id = getattr(celda, "_style_id", 0)
+                clase = clases.get(style_id)
+                if clase is None:
+                    css = _css_celda(celda) if style_id else ""
+                    clase = por_css.get(css, "") if css else ""
+                    if css and not clase:
+                        clase = por_css[css] = f"x{len(reglas)}"
+                        reglas.append(f"table.xl td.{clase}{{{css}}}")
+                    clases[style_id] = clase
+
+                valor = _texto_excel(celda.value)
+                partes.append(f"<td class='{clase}'>{valor}</td>" if clase else f"<td>{valor}</td>")
+
+            partes.append("</tr>")
+            filas.append("".join(partes))
+    finally:
+        libro.close()
+
+    html = "".join([
+        "<style>", CSS_EXCEL, "".join(reglas), "</style>",
+        "<table class='xl'><tbody>", "".join(filas), "</tbody></table>",
+    ])
+
+    log.debug("Vista previa de %r: %d filas, %d estilos, %d bytes de HTML",
+              ws.title, len(filas), len(reglas), len(html.encode("utf-8")))
+    return html